@@ -1,5 +1,7 @@
 from django.apps import AppConfig
+import atexit
 import logging
+from oraculum.log_queue import start_queue_listener
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +14,11 @@ class JobsConfig(AppConfig):
         """
         Initialize the scheduler when Django starts
         """
+        # Start writing out the records queued by the 'queue' log handler
+        listener = start_queue_listener()
+        if listener is not None:
+            atexit.register(listener.stop)
+
         # Import here to avoid AppRegistryNotReady exception
         try:
             from jobs import scheduler
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-15 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_update_job_types'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='queuejob',
+            index=models.Index(fields=['job_type', 'status', 'created_at'], name='qjob_type_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='queuejob',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='qjob_pending_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from gallery.models import Picture
 
 class QueueJob(models.Model):
@@ -27,4 +28,10 @@ class QueueJob(models.Model):
     class Meta:
         verbose_name = "Queue Job"
         verbose_name_plural = "Queue Jobs"
-        ordering = ['created_at']
\ No newline at end of file
+        ordering = ['created_at']
+        indexes = [
+            # Serves the workers' pending-job scan (filter by type and status, oldest first) without a sort
+            models.Index(fields=['job_type', 'status', 'created_at'], name='qjob_type_status_created_idx'),
+            # Small partial index over just the pending rows, on databases that support it
+            models.Index(fields=['created_at'], condition=Q(status='pending'), name='qjob_pending_idx'),
+        ]
\ No newline at end of file
@@ -1,6 +1,9 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from django.core import management
+from tagging.ollama import OllamaService
+from tagging.runner import load_prompt_template, resolve_vision_model, run_batch
 import logging
+import os
 import sys
 import atexit
 
@@ -9,6 +12,32 @@ logger = logging.getLogger(__name__)
 # Global scheduler instance
 scheduler = None
 
+# Ollama client and vision model reused by every tagging tick
+ollama_service = None
+vision_model = None
+
+def process_tagging_jobs(max_jobs=3):
+    """
+    Process one batch of tagging jobs in-process, keeping the Ollama client warm between ticks.
+    """
+    global ollama_service, vision_model
+
+    if ollama_service is None:
+        ollama_service = OllamaService()
+
+    if not ollama_service.is_server_running():
+        logger.warning("Ollama server is not running - skipping tagging jobs")
+        return
+
+    # Resolve and load the vision model on the first tick only; keep_alive keeps it loaded
+    if vision_model is None:
+        vision_model = resolve_vision_model(ollama_service)
+        ollama_service.preload(vision_model)
+
+    prompt_template = load_prompt_template()
+    if prompt_template:
+        run_batch(ollama_service, prompt_template, vision_model, max_jobs)
+
 def start():
     """
     Start the APScheduler to run management commands on schedule.
@@ -20,6 +49,12 @@ def start():
         logger.info("Scheduler not started - running administrative command")
         return
 
+    # With the autoreloader, runserver imports the project in both the watcher process and the
+    # child that serves requests; only start in the child so jobs are not scheduled twice
+    if 'runserver' in sys.argv and '--noreload' not in sys.argv and os.environ.get('RUN_MAIN') != 'true':
+        logger.info("Scheduler not started - runserver autoreloader process")
+        return
+
     # Don't start if already running
     if scheduler is not None and scheduler.running:
         logger.info("Scheduler already running")
@@ -48,7 +83,7 @@ def start():
     )
 
     scheduler.add_job(
-        lambda: management.call_command('process_tagging_jobs', max_jobs=3, run_once=True),
+        process_tagging_jobs,
         'interval',
         minutes=2, # Schedule tagging jobs to run every 2 minutes
         id='tagging_job',
@@ -0,0 +1,36 @@
+import logging
+import logging.config
+from multiprocessing import util
+
+
+def start_queue_listener():
+    """
+    Start the listener that writes out the records queued by the 'queue' handler of settings.LOGGING,
+    returning it (or None when that handler is not configured)
+    """
+    queue_handler = logging.getHandlerByName('queue')
+    if queue_handler is None or queue_handler.listener is None:
+        return None
+    queue_handler.listener.start()
+    return queue_handler.listener
+
+
+def configure_worker_logging():
+    """
+    Apply settings.LOGGING in a multiprocessing worker. Forked workers inherit the queue handler but
+    not its listener thread, and spawned ones inherit no logging setup, so their records would be lost.
+    """
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+
+    try:
+        logging_config = settings.LOGGING
+    except ImproperlyConfigured:
+        # Used outside of a Django project: keep the process' logging as it is
+        return
+
+    logging.config.dictConfig(logging_config)
+    listener = start_queue_listener()
+    if listener is not None:
+        # Worker processes exit without running atexit handlers, but multiprocessing finalizers do run
+        util.Finalize(listener, listener.stop, exitpriority=10)
@@ -156,20 +156,37 @@ LOGGING = {
             'filename': BASE_DIR / 'scheduler.log',
             'formatter': 'verbose',
         },
+        # Hands records to a background QueueListener (started in JobsConfig.ready) that writes
+        # them to the console and file, so the workers never block on log I/O
+        'queue': {
+            'class': 'logging.handlers.QueueHandler',
+            'handlers': ['console', 'file'],
+            'respect_handler_level': True,
+        },
     },
     'loggers': {
         'jobs.scheduler': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
         'jobs.apps': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
         'apscheduler': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'tagging': {
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'recognition': {
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
@@ -1,18 +1,15 @@
 import os
 import logging
 import time
+import cv2
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.utils import timezone
 from jobs.models import QueueJob
 from recognition.models import FaceExtraction
 from recognition.service import FaceExtractionService
 
-# Configure logging for this command
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - [DNN_EXTRACTION] - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Log records go through the 'recognition' logger configured in settings.LOGGING
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
@@ -36,16 +33,25 @@ class Command(BaseCommand):
             default=0.5,
             help='Minimum confidence threshold for DNN face detection (default: 0.5)'
         )
+        parser.add_argument(
+            '--cpu-affinity',
+            type=str,
+            help='Comma-separated list of CPU cores to pin the worker to (e.g. 4,5,6,7). Also lowers the worker priority'
+        )
 
     def handle(self, *args, **options):
         max_jobs = options.get('max_jobs', 3)
         run_once = options.get('run_once', False)
         confidence_threshold = options.get('confidence_threshold', 0.5)
+        cpu_affinity = options.get('cpu_affinity')
 
         start_message = f'🧠 Starting DNN face extraction job processor (max_jobs: {max_jobs}, confidence: {confidence_threshold})'
         self.stdout.write(self.style.SUCCESS(start_message))
         logger.info(start_message)
 
+        if cpu_affinity:
+            self._configure_cpu_affinity(cpu_affinity)
+
         # Initialize Face Extraction service
         try:
             face_extraction_service = FaceExtractionService()
@@ -63,6 +69,36 @@ class Command(BaseCommand):
         else:
             self._process_jobs_continuously(face_extraction_service, max_jobs, confidence_threshold)
 
+    def _configure_cpu_affinity(self, cpu_affinity):
+        """Pin the worker to the given CPU cores and lower its priority; invalid input keeps the current affinity"""
+        # CPU affinity and niceness are not available on every platform (e.g. Windows)
+        if not hasattr(os, 'sched_setaffinity'):
+            logger.warning('⚠️ CPU affinity is not supported on this platform')
+            return
+
+        try:
+            cpus = {int(cpu) for cpu in cpu_affinity.split(',') if cpu.strip()}
+        except ValueError:
+            cpus = set()
+        available_cpus = os.sched_getaffinity(0)
+        if not cpus or not cpus <= available_cpus:
+            warning_message = (f'⚠️ Invalid --cpu-affinity "{cpu_affinity}" (available CPUs: {sorted(available_cpus)}), '
+                'keeping the current CPU affinity')
+            self.stdout.write(self.style.WARNING(warning_message))
+            logger.warning(warning_message)
+            return
+
+        # Size OpenCV's thread pool to the pinned cores to avoid oversubscription
+        cv2.setNumThreads(len(cpus))
+        os.sched_setaffinity(0, cpus)
+
+        if hasattr(os, 'nice'):
+            os.nice(10)
+
+        affinity_message = f'📌 DNN face extraction worker pinned to CPU(s) {sorted(cpus)} with lowered priority'
+        self.stdout.write(affinity_message)
+        logger.info(affinity_message)
+
     def _process_jobs_once(self, face_extraction_service, max_jobs, confidence_threshold):
         """Process jobs once and exit"""
         logger.info(f'🎯 Processing DNN face extraction jobs once (max: {max_jobs}, confidence: {confidence_threshold})')
@@ -106,62 +142,74 @@ class Command(BaseCommand):
         failed_count = 0
 
         # Get pending DNN face extraction jobs
-        pending_jobs = QueueJob.objects.filter(
+        # Only load the fields used below; statuses are written with update(), not job.save()
+        pending_jobs = list(QueueJob.objects.filter(
             job_type=QueueJob.JobTypeChoices.FACE_EXTRACTION_DNN,
             status=QueueJob.StatusChoices.PENDING
-        ).select_related('picture').order_by('created_at')[:max_jobs]
+        ).select_related('picture').only(
+            'id', 'picture__id', 'picture__title', 'picture__image'
+        ).order_by('created_at')[:max_jobs])
 
-        if not pending_jobs.exists():
+        if not pending_jobs:
             logger.debug('No pending DNN face extraction jobs found')
             return processed_count, failed_count
 
-        job_count_message = f'📋 Found {pending_jobs.count()} pending DNN face extraction job(s) to process'
+        job_count_message = f'📋 Found {len(pending_jobs)} pending DNN face extraction job(s) to process'
         self.stdout.write(job_count_message)
         logger.info(job_count_message)
 
-        for job in pending_jobs:
-            job_start_time = time.time()
-            try:
-                with transaction.atomic():
-                    # Update job status to processing
-                    job.status = QueueJob.StatusChoices.PROCESSING
-                    job.save()
+        # Mark the whole batch as processing in one UPDATE. Each job's final status is written as
+        # soon as it is done; if the run is interrupted, the jobs not reached yet go back to pending
+        self._update_jobs_status([job.id for job in pending_jobs], QueueJob.StatusChoices.PROCESSING)
+        finished_ids = set()
 
-                    processing_message = f'⚙️ Processing DNN face extraction job ID {job.id} for picture ID {job.picture.id}: {job.picture.title}'
-                    self.stdout.write(processing_message)
-                    logger.info(processing_message)
+        try:
+            for job in pending_jobs:
+                job_start_time = time.time()
+                try:
+                    with transaction.atomic():
+                        processing_message = f'⚙️ Processing DNN face extraction job ID {job.id} for picture ID {job.picture.id}: {job.picture.title}'
+                        self.stdout.write(processing_message)
+                        logger.info(processing_message)
 
-                    # Get the image path
-                    image_path = job.picture.image.path
-                    if not os.path.exists(image_path):
-                        raise Exception(f'Image file not found: {image_path}')
+                        # Get the image path
+                        image_path = job.picture.image.path
+                        if not os.path.exists(image_path):
+                            raise Exception(f'Image file not found: {image_path}')
 
-                    # Extract faces from the image using DNN
-                    self._extract_faces_dnn(job.picture, image_path, face_extraction_service, confidence_threshold)
+                        # Extract faces from the image using DNN
+                        self._extract_faces_dnn(job.picture, image_path, face_extraction_service, confidence_threshold)
 
-                    # Update job status to completed
-                    job.status = QueueJob.StatusChoices.COMPLETED
-                    job.save()
+                        # The final status is committed together with the job's face extractions
+                        self._update_jobs_status([job.id], QueueJob.StatusChoices.COMPLETED)
+                        job_duration = time.time() - job_start_time
+                        processed_count += 1
+                        success_message = f'✅ Successfully processed DNN face extraction job ID {job.id} for picture ID {job.picture.id} in {job_duration:.2f}s'
+                        self.stdout.write(self.style.SUCCESS(success_message))
+                        logger.info(success_message)
+                    finished_ids.add(job.id)
 
+                except Exception as e:
+                    self._update_jobs_status([job.id], QueueJob.StatusChoices.FAILED)
+                    finished_ids.add(job.id)
                     job_duration = time.time() - job_start_time
-                    processed_count += 1
-                    success_message = f'✅ Successfully processed DNN face extraction job ID {job.id} for picture ID {job.picture.id} in {job_duration:.2f}s'
-                    self.stdout.write(self.style.SUCCESS(success_message))
-                    logger.info(success_message)
-
-            except Exception as e:
-                # Update job status to failed
-                job.status = QueueJob.StatusChoices.FAILED
-                job.save()
-
-                job_duration = time.time() - job_start_time
-                failed_count += 1
-                error_message = f'❌ Failed to process DNN face extraction job ID {job.id} for picture ID {job.picture.id} after {job_duration:.2f}s: {str(e)}'
-                self.stdout.write(self.style.ERROR(error_message))
-                logger.error(error_message, exc_info=True)
+                    failed_count += 1
+                    error_message = f'❌ Failed to process DNN face extraction job ID {job.id} for picture ID {job.picture.id} after {job_duration:.2f}s: {str(e)}'
+                    self.stdout.write(self.style.ERROR(error_message))
+                    logger.error(error_message, exc_info=True)
+        finally:
+            self._update_jobs_status(
+                [job.id for job in pending_jobs if job.id not in finished_ids], QueueJob.StatusChoices.PENDING
+            )
 
         return processed_count, failed_count
 
+    def _update_jobs_status(self, job_ids, status):
+        """Set the status of the given jobs in a single UPDATE"""
+        if job_ids:
+            # update() skips auto_now, so refresh updated_at explicitly
+            QueueJob.objects.filter(id__in=job_ids).update(status=status, updated_at=timezone.now())
+
     def _extract_faces_dnn(self, picture, image_path, face_extraction_service, confidence_threshold):
         """Extract faces from the image using DNN and create FaceExtraction objects"""
         try:
@@ -183,17 +231,15 @@ class Command(BaseCommand):
                 picture=picture,
                 algorithm=FaceExtraction.AlgorithmChoices.DNN
             )
-            if existing_extractions.exists():
-                deleted_count = existing_extractions.count()
-                existing_extractions.delete()
+            deleted_count, _ = existing_extractions.delete()
+            if deleted_count:
                 cleanup_message = f'🧹 Removed {deleted_count} existing DNN face extractions for picture ID {picture.id}'
                 self.stdout.write(cleanup_message)
                 logger.info(cleanup_message)
 
-            # Create FaceExtraction objects for each detected face
-            created_count = 0
-            for face_data in faces_data:
-                face_extraction = FaceExtraction.objects.create(
+            # Create all FaceExtraction objects for this picture in a single batched INSERT
+            face_extractions = FaceExtraction.objects.bulk_create([
+                FaceExtraction(
                     picture=picture,
                     bbox_x=face_data['bbox_x'],
                     bbox_y=face_data['bbox_y'],
@@ -202,7 +248,11 @@ class Command(BaseCommand):
                     confidence=face_data['confidence'],
                     algorithm=FaceExtraction.AlgorithmChoices.DNN
                 )
-                created_count += 1
+                for face_data in faces_data
+            ], batch_size=500)
+            created_count = len(face_extractions)
+
+            for face_extraction, face_data in zip(face_extractions, faces_data):
                 detection_type = face_data.get('detection_type', 'dnn_enhanced')
                 face_created_message = (f'🤖 Created DNN face extraction ID {face_extraction.id} ({detection_type}): '
                     f'bbox=({face_data["bbox_x"]}, {face_data["bbox_y"]}, {face_data["bbox_width"]}, {face_data["bbox_height"]}), '
@@ -3,16 +3,12 @@ import logging
 import time
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.utils import timezone
 from jobs.models import QueueJob
 from recognition.models import FaceExtraction
 from recognition.service import FaceExtractionService
 
-# Configure logging for this command
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - [HAAR_EXTRACTION] - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Log records go through the 'recognition' logger configured in settings.LOGGING
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
@@ -66,12 +62,13 @@ class Command(BaseCommand):
         logger.info(completion_message)
 
     def _process_jobs_continuously(self, face_extraction_service, max_jobs):
-        """Process jobs continuously every 15 seconds"""
+        """Process jobs continuously, backing off up to 15 seconds while the queue is empty"""
         
-        start_message = '🔄 Starting continuous Haar Cascade face extraction processing (every 15 seconds)...'
+        start_message = '🔄 Starting continuous Haar Cascade face extraction processing (adaptive polling, up to 15 seconds)...'
         self.stdout.write(start_message)
         logger.info(start_message)
         
+        idle_sleep = 1.0
         try:
             while True:
                 logger.info('🔍 Checking for pending Haar Cascade face extraction jobs...')
@@ -84,9 +81,21 @@ class Command(BaseCommand):
                 else:
                     logger.debug('No Haar Cascade face extraction jobs to process')
                 
-                logger.info('⏳ Waiting 15 seconds before next Haar Cascade face extraction check...')
-                # Wait 15 seconds before next check
-                time.sleep(15)
+                if processed_count == max_jobs:
+                    # Full batch - more jobs are likely pending, check again right away
+                    idle_sleep = 1.0
+                    continue
+
+                if processed_count + failed_count == 0:
+                    # Empty queue - back off exponentially, capped at 15 seconds
+                    wait_seconds = idle_sleep
+                    idle_sleep = min(idle_sleep * 2, 15)
+                else:
+                    wait_seconds = 1
+                    idle_sleep = 1.0
+
+                logger.info(f'⏳ Waiting {wait_seconds:g} seconds before next Haar Cascade face extraction check...')
+                time.sleep(wait_seconds)
                 
         except KeyboardInterrupt:
             stop_message = '⚠️ Haar Cascade face extraction processor stopped by user'
@@ -99,62 +108,74 @@ class Command(BaseCommand):
         failed_count = 0
 
         # Get pending Haar Cascade face extraction jobs
-        pending_jobs = QueueJob.objects.filter(
+        # Only load the fields used below; statuses are written with update(), not job.save()
+        pending_jobs = list(QueueJob.objects.filter(
             job_type=QueueJob.JobTypeChoices.FACE_EXTRACTION_HAAR,
             status=QueueJob.StatusChoices.PENDING
-        ).select_related('picture').order_by('created_at')[:max_jobs]
+        ).select_related('picture').only(
+            'id', 'picture__id', 'picture__title', 'picture__image'
+        ).order_by('created_at')[:max_jobs])
 
-        if not pending_jobs.exists():
+        if not pending_jobs:
             logger.debug('No pending Haar Cascade face extraction jobs found')
             return processed_count, failed_count
 
-        job_count_message = f'📋 Found {pending_jobs.count()} pending Haar Cascade face extraction job(s) to process'
+        job_count_message = f'📋 Found {len(pending_jobs)} pending Haar Cascade face extraction job(s) to process'
         self.stdout.write(job_count_message)
         logger.info(job_count_message)
 
-        for job in pending_jobs:
-            job_start_time = time.time()
-            try:
-                with transaction.atomic():
-                    # Update job status to processing
-                    job.status = QueueJob.StatusChoices.PROCESSING
-                    job.save()
-
-                    processing_message = f'⚙️ Processing Haar Cascade face extraction job ID {job.id} for picture ID {job.picture.id}: {job.picture.title}'
-                    self.stdout.write(processing_message)
-                    logger.info(processing_message)
-
-                    # Get the image path
-                    image_path = job.picture.image.path
-                    if not os.path.exists(image_path):
-                        raise Exception(f'Image file not found: {image_path}')
-
-                    # Extract faces from the image using Haar Cascade
-                    self._extract_faces_haar(job.picture, image_path, face_extraction_service)
-
-                    # Update job status to completed
-                    job.status = QueueJob.StatusChoices.COMPLETED
-                    job.save()
+        # Mark the whole batch as processing in one UPDATE. Each job's final status is written as
+        # soon as it is done; if the run is interrupted, the jobs not reached yet go back to pending
+        self._update_jobs_status([job.id for job in pending_jobs], QueueJob.StatusChoices.PROCESSING)
+        finished_ids = set()
 
+        try:
+            for job in pending_jobs:
+                job_start_time = time.time()
+                try:
+                    with transaction.atomic():
+                        processing_message = f'⚙️ Processing Haar Cascade face extraction job ID {job.id} for picture ID {job.picture.id}: {job.picture.title}'
+                        self.stdout.write(processing_message)
+                        logger.info(processing_message)
+
+                        # Get the image path
+                        image_path = job.picture.image.path
+                        if not os.path.exists(image_path):
+                            raise Exception(f'Image file not found: {image_path}')
+
+                        # Extract faces from the image using Haar Cascade
+                        self._extract_faces_haar(job.picture, image_path, face_extraction_service)
+
+                        # The final status is committed together with the job's face extractions
+                        self._update_jobs_status([job.id], QueueJob.StatusChoices.COMPLETED)
+                        job_duration = time.time() - job_start_time
+                        processed_count += 1
+                        success_message = f'✅ Successfully processed Haar Cascade face extraction job ID {job.id} for picture ID {job.picture.id} in {job_duration:.2f}s'
+                        self.stdout.write(self.style.SUCCESS(success_message))
+                        logger.info(success_message)
+                    finished_ids.add(job.id)
+
+                except Exception as e:
+                    self._update_jobs_status([job.id], QueueJob.StatusChoices.FAILED)
+                    finished_ids.add(job.id)
                     job_duration = time.time() - job_start_time
-                    processed_count += 1
-                    success_message = f'✅ Successfully processed Haar Cascade face extraction job ID {job.id} for picture ID {job.picture.id} in {job_duration:.2f}s'
-                    self.stdout.write(self.style.SUCCESS(success_message))
-                    logger.info(success_message)
-
-            except Exception as e:
-                # Update job status to failed
-                job.status = QueueJob.StatusChoices.FAILED
-                job.save()
-
-                job_duration = time.time() - job_start_time
-                failed_count += 1
-                error_message = f'❌ Failed to process Haar Cascade face extraction job ID {job.id} for picture ID {job.picture.id} after {job_duration:.2f}s: {str(e)}'
-                self.stdout.write(self.style.ERROR(error_message))
-                logger.error(error_message, exc_info=True)
+                    failed_count += 1
+                    error_message = f'❌ Failed to process Haar Cascade face extraction job ID {job.id} for picture ID {job.picture.id} after {job_duration:.2f}s: {str(e)}'
+                    self.stdout.write(self.style.ERROR(error_message))
+                    logger.error(error_message, exc_info=True)
+        finally:
+            self._update_jobs_status(
+                [job.id for job in pending_jobs if job.id not in finished_ids], QueueJob.StatusChoices.PENDING
+            )
 
         return processed_count, failed_count
 
+    def _update_jobs_status(self, job_ids, status):
+        """Set the status of the given jobs in a single UPDATE"""
+        if job_ids:
+            # update() skips auto_now, so refresh updated_at explicitly
+            QueueJob.objects.filter(id__in=job_ids).update(status=status, updated_at=timezone.now())
+
     def _extract_faces_haar(self, picture, image_path, face_extraction_service):
         """Extract faces from the image using Haar Cascade and create FaceExtraction objects"""
         try:
@@ -163,7 +184,7 @@ class Command(BaseCommand):
             logger.info(extraction_start_message)
 
             # Extract faces using the Haar Cascade service
-            faces_data = face_extraction_service.extract_faces(image_path)
+            faces_data = face_extraction_service.extract_faces_haar(image_path)
 
             if not faces_data:
                 no_faces_message = f'👤 No faces detected in picture ID {picture.id} using Haar Cascade'
@@ -176,17 +197,15 @@ class Command(BaseCommand):
                 picture=picture,
                 algorithm=FaceExtraction.AlgorithmChoices.HAAR
             )
-            if existing_extractions.exists():
-                deleted_count = existing_extractions.count()
-                existing_extractions.delete()
+            deleted_count, _ = existing_extractions.delete()
+            if deleted_count:
                 cleanup_message = f'🧹 Removed {deleted_count} existing Haar Cascade face extractions for picture ID {picture.id}'
                 self.stdout.write(cleanup_message)
                 logger.info(cleanup_message)
 
-            # Create FaceExtraction objects for each detected face
-            created_count = 0
-            for face_data in faces_data:
-                face_extraction = FaceExtraction.objects.create(
+            # Create all FaceExtraction objects for this picture in a single batched INSERT
+            face_extractions = FaceExtraction.objects.bulk_create([
+                FaceExtraction(
                     picture=picture,
                     bbox_x=face_data['bbox_x'],
                     bbox_y=face_data['bbox_y'],
@@ -195,7 +214,11 @@ class Command(BaseCommand):
                     confidence=face_data['confidence'],
                     algorithm=FaceExtraction.AlgorithmChoices.HAAR
                 )
-                created_count += 1
+                for face_data in faces_data
+            ], batch_size=500)
+            created_count = len(face_extractions)
+
+            for face_extraction, face_data in zip(face_extractions, faces_data):
                 face_created_message = (f'👤 Created Haar Cascade face extraction ID {face_extraction.id}: '
                     f'bbox=({face_data["bbox_x"]}, {face_data["bbox_y"]}, {face_data["bbox_width"]}, {face_data["bbox_height"]}), '
                     f'confidence={face_data["confidence"]:.3f}')
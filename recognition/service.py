@@ -2,9 +2,112 @@ import cv2
 import numpy as np
 import os
 import logging
+import threading
+import queue
+import copy
+import functools
+from collections import OrderedDict, namedtuple
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# Per-channel (BGR) mean the OpenCV ResNet-SSD face detector was trained with
+DNN_MEAN = (104.0, 177.0, 123.0)
+
+# Cascade candidates whose 16-bin intensity histogram has less entropy than this (in bits)
+# are flat patches rather than faces and are dropped before scoring
+MIN_FACE_ENTROPY = 2.5
+
+# Internal detection results as parallel arrays: boxes is an (N, 4) int32 array of [x, y, width, height],
+# scores an (N,) float array and types a list of N detection type names
+Detections = namedtuple('Detections', 'boxes scores types')
+
+# Haar cascades are read-only once loaded, so every service instance shares one copy of each.
+# A classifier is not safe to run from several threads at once, hence the per-cascade lock.
+_cascades = {}
+_cascades_lock = threading.Lock()
+
+
+def _get_cascade(path: str) -> tuple[cv2.CascadeClassifier, threading.Lock]:
+    """Return the shared classifier (and its lock) for a cascade file, loading it on first use"""
+    with _cascades_lock:
+        if path not in _cascades:
+            _cascades[path] = (cv2.CascadeClassifier(path), threading.Lock())
+        return _cascades[path]
+
+
+# The DNN model is loaded, and its backend probed, once per process and shared by every service
+# instance like the cascades. The network is not safe to run from several threads at once, so it
+# comes with a lock that serializes setInput/forward. None once loading has failed
+_dnn_model = None
+_dnn_model_lock = threading.Lock()
+
+
+def _get_dnn_model(load: Callable[[], cv2.dnn.Net | None]) -> tuple[cv2.dnn.Net | None, threading.Lock]:
+    """Return the shared DNN network (or None if it is not available) and its lock, loading it on first use"""
+    global _dnn_model
+    with _dnn_model_lock:
+        if _dnn_model is None:
+            _dnn_model = (load(), threading.Lock())
+        return _dnn_model
+
+
+# Optional model files that were reported missing. Every service instance looks for them again,
+# so each one is only logged the first time
+_reported_missing_models = set()
+
+
+def _report_missing_model(filename: str, message: str):
+    """Log once per process that an optional model file is not available"""
+    if filename not in _reported_missing_models:
+        _reported_missing_models.add(filename)
+        logger.info(message)
+
+
+def _find_lbp_cascade(filename: str) -> str | None:
+    """
+    Locate an LBP cascade file. The opencv-python wheels only ship Haar cascades,
+    so the models directory is checked first, then OpenCV's own LBP cascade directory if it exists.
+    """
+    candidates = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", filename)]
+    if hasattr(cv2.data, 'lbpcascades'):
+        candidates.append(os.path.join(cv2.data.lbpcascades, filename))
+    
+    return next((path for path in candidates if os.path.exists(path)), None)
+
+
+@functools.lru_cache(maxsize=8)
+def _scan_params_for_size(h: int, w: int, min_face_ratio: float) -> tuple[float, int, tuple[int, int], tuple[int, int]]:
+    """
+    Return (scaleFactor, minNeighbors, minSize, maxSize) for scanning an image of the given size.
+    Cached since most images end up at one of a few sizes after downscaling.
+    """
+    min_face = max(30, int(min(h, w) * min_face_ratio))
+    # Close-up portraits can fill the whole frame, so only sizes the image cannot hold are skipped
+    max_face = max(min_face, min(h, w))
+    return 1.1, 5, (min_face, min_face), (max_face, max_face)
+
+
+# Service used by extract_faces_batch worker processes, created once per process
+_worker_service = None
+
+
+def _init_batch_worker(service_options: dict[str, any], configure_logging: Callable[[], None] | None = None):
+    """
+    Create the worker process' service with the caller's settings and a single OpenCV thread,
+    to avoid oversubscribing the cores
+    """
+    global _worker_service
+    if configure_logging is not None:
+        configure_logging()
+    _worker_service = FaceExtractionService(opencv_threads=1, **service_options)
+
+
+def _extract_faces_in_worker(image_path: str, confidence_threshold: float, compute_confidence: bool = True) -> list[dict[str, any]]:
+    """Run extract_faces on the worker process' service"""
+    return _worker_service.extract_faces(image_path, confidence_threshold, compute_confidence)
+
 
 class FaceExtractionService:
     """Service for extracting faces from images using OpenCV"""
@@ -12,18 +115,46 @@ class FaceExtractionService:
     class DetectionMethodChoices:
         HAAR = 'haar', 'Haar Cascade'
         DNN = 'dnn', 'Deep Neural Network'
+        YUNET = 'yunet', 'YuNet'
+        LBP = 'lbp', 'LBP Cascade'
         
         @classmethod
         def choices(cls):
-            return [cls.HAAR, cls.DNN]
+            return [cls.HAAR, cls.DNN, cls.YUNET, cls.LBP]
     
-    def __init__(self):
-        """Initialize the face extraction service with OpenCV cascade classifiers and DNN model"""
+    def __init__(self, max_detection_side: int = 960, min_face_ratio: float = 0.025, opencv_threads: int | None = None,
+                 fast_gray: bool = False, detector: str = 'haar'):
+        """
+        Initialize the face extraction service with OpenCV cascade classifiers and DNN model
+        
+        Args:
+            max_detection_side (int): Images whose longest side exceeds this size are downscaled
+                before Haar detection; bounding boxes are scaled back to the original size
+            min_face_ratio (float): Smallest face searched for by the cascades, as a fraction
+                of the shorter image side (never below 30 pixels)
+            opencv_threads (int | None): Size of OpenCV's thread pool. Set to 1 under multi-process
+                servers so the workers do not oversubscribe the CPU; None keeps OpenCV's default
+            fast_gray (bool): Use the green channel as the Haar input instead of a weighted
+                BGR-to-gray conversion (cheaper on very large images, slightly less accurate gray)
+            detector (str): Cascade used by extract_faces when the DNN model is not available -
+                'lbp' (faster, integer-only features) or 'haar'
+        """
+        # Make sure OpenCV's SIMD code paths are enabled (they can be switched off process-wide)
+        cv2.setUseOptimized(True)
+        if opencv_threads:
+            cv2.setNumThreads(opencv_threads)
+        # Logged at debug level since a new service is created on every scheduler run
+        logger.debug(f"OpenCV optimized code: {cv2.useOptimized()}, threads: {cv2.getNumThreads()}")
+        
+        self.max_detection_side = max_detection_side
+        self.min_face_ratio = min_face_ratio
+        self.fast_gray = fast_gray
+        
         # Use OpenCV's built-in Haar cascade for face detection
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.face_cascade, self._face_cascade_lock = _get_cascade(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         
         # Optional: Add profile face cascade for better detection
-        self.profile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_profileface.xml')
+        self.profile_cascade, self._profile_cascade_lock = _get_cascade(cv2.data.haarcascades + 'haarcascade_profileface.xml')
         
         if self.face_cascade.empty():
             raise Exception("Could not load frontal face cascade classifier")
@@ -31,123 +162,569 @@ class FaceExtractionService:
         if self.profile_cascade.empty():
             logger.warning("Could not load profile face cascade classifier - only frontal faces will be detected")
             self.profile_cascade = None
+        
+        # Optional LBP cascades, a faster alternative to the Haar ones
+        self.lbp_cascade, self._lbp_cascade_lock = self._load_lbp_cascade('lbpcascade_frontalface_improved.xml')
+        self.lbp_profile_cascade, self._lbp_profile_cascade_lock = self._load_lbp_cascade('lbpcascade_profileface.xml')
+        
+        # LBP cascades on the GPU, when OpenCV is built with CUDA and a device is present
+        self.gpu_lbp_cascade = None
+        self.gpu_lbp_profile_cascade = None
+        self._init_gpu_cascades()
+        
+        if detector == 'lbp' and self.lbp_cascade is None:
+            logger.warning("LBP cascade requested but not available - falling back to Haar cascades")
+            detector = 'haar'
+        self.detector = detector
+        
+        # Settings handed to the services of worker processes, so they detect like this instance
+        self._worker_options = {
+            'max_detection_side': max_detection_side,
+            'min_face_ratio': min_face_ratio,
+            'fast_gray': fast_gray,
+            'detector': detector,
+        }
+        
+        # Use OpenCL through OpenCV's transparent API (UMat) when a device is available
+        self.use_opencl = cv2.ocl.haveOpenCL()
+        if self.use_opencl:
+            cv2.ocl.setUseOpenCL(True)
+            logger.info("OpenCL is available - Haar detection will use the OpenCV transparent API")
+        
+        # Recent detection results keyed by (path, mtime, method, confidence threshold, compute_confidence)
+        self._result_cache = OrderedDict()
+        self._result_cache_size = 64
+        self._result_cache_lock = threading.Lock()
+        
+        # Recently decoded images keyed by (path, mtime), so consecutive calls on the same file
+        # (e.g. several detection methods) decode it only once
+        self._image_cache = OrderedDict()
+        self._image_cache_size = 4
+        self._image_cache_lock = threading.Lock()
+        
+        # Shared pool used to run the frontal and profile cascades concurrently
+        # (OpenCV releases the GIL while detecting)
+        self._cascade_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='haar-cascade')
             
-        # Initialize DNN model for more accurate face detection
-        self.dnn_net = None
-        self._init_dnn_model()
+        # Initialize DNN model for more accurate face detection (shared by all instances)
+        self.dnn_net, self._dnn_lock = _get_dnn_model(self._init_dnn_model)
+        # Reused 300x300 input buffer for the DNN, only written while holding the DNN lock
+        self._dnn_input_buffer = np.empty((300, 300, 3), np.uint8)
+        
+        # YuNet detector (optional); its input size changes per image, so calls are serialized as well
+        self.yunet_detector = None
+        self._yunet_lock = threading.Lock()
+        self._init_yunet_model()
+        
+        self._warmup()
     
-    def _init_dnn_model(self):
-        """Initialize OpenCV DNN model for face detection"""
+    def _init_dnn_model(self) -> cv2.dnn.Net | None:
+        """
+        Initialize OpenCV DNN model for face detection
+        
+        Returns:
+            The loaded network running on the selected backend, or None if DNN detection is not available
+        """
         try:
             # Get the current directory and construct model paths
             current_dir = os.path.dirname(os.path.abspath(__file__))
             models_dir = os.path.join(current_dir, "models")
             
+            # Prefer the INT8-quantized export of the detector when it is available
+            dnn_net = self._load_quantized_dnn_model(os.path.join(models_dir, "face_detector_int8.onnx"))
+            if dnn_net is not None:
+                return self._select_dnn_backend(dnn_net, prefer_fp16=True)
+            
             model_file = os.path.join(models_dir, "opencv_face_detector_uint8.pb")
             config_file = os.path.join(models_dir, "opencv_face_detector.pbtxt")
             
             # Check if model files exist - log warning if missing but don't throw exception
             if not os.path.exists(model_file) or not os.path.exists(config_file):
                 logger.warning("DNN model files not found - DNN detection will not be available")
-                self.dnn_net = None
-                return
+                return None
             
             # Load the DNN model
-            self.dnn_net = cv2.dnn.readNetFromTensorflow(model_file, config_file)
+            dnn_net = cv2.dnn.readNetFromTensorflow(model_file, config_file)
             
-            if self.dnn_net.empty():
+            if dnn_net.empty():
                 logger.warning("Failed to load DNN model - DNN detection will not be available")
-                self.dnn_net = None
-            else:
-                logger.info("DNN face detection model loaded successfully")
+                return None
+            
+            logger.info("DNN face detection model loaded successfully")
+            return self._select_dnn_backend(dnn_net)
             
         except Exception as e:
             logger.warning(f"Could not initialize DNN model: {str(e)} - DNN detection will not be available")
-            self.dnn_net = None
+            return None
+
+    def _load_quantized_dnn_model(self, model_file: str):
+        """
+        Load the optional INT8-quantized ONNX face detector.
+        
+        Args:
+            model_file: Path to the quantized ONNX model
+            
+        Returns:
+            The loaded network, or None if the model is missing or cannot be loaded
+        """
+        if not os.path.exists(model_file):
+            return None
+        
+        try:
+            net = cv2.dnn.readNetFromONNX(model_file)
+            if net.empty():
+                raise ValueError("model is empty")
+            logger.info("Quantized INT8 DNN face detection model loaded successfully")
+            return net
+        except Exception as e:
+            logger.warning(f"Could not load quantized DNN model: {str(e)} - falling back to the FP32 model")
+            return None
+
+    def _init_yunet_model(self):
+        """Initialize OpenCV YuNet face detector if a face_detection_yunet_*.onnx model is present"""
+        try:
+            models_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+            model_files = sorted(
+                name for name in os.listdir(models_dir)
+                if name.startswith("face_detection_yunet") and name.endswith(".onnx")
+            ) if os.path.isdir(models_dir) else []
+            
+            if not model_files:
+                _report_missing_model('face_detection_yunet', "YuNet model file not found - YuNet detection will not be available")
+                return
+            
+            # The input size is a placeholder, it is set for every image before detecting
+            model_file = os.path.join(models_dir, model_files[-1])
+            self.yunet_detector = cv2.FaceDetectorYN_create(model_file, "", (320, 320))
+            logger.info(f"YuNet face detection model loaded successfully: {model_files[-1]}")
+            
+        except Exception as e:
+            logger.warning(f"Could not initialize YuNet model: {str(e)} - YuNet detection will not be available")
+            self.yunet_detector = None
+
+    def _load_lbp_cascade(self, filename: str) -> tuple[cv2.CascadeClassifier, threading.Lock] | tuple[None, None]:
+        """Load a shared LBP cascade, returning (None, None) if it is missing or cannot be parsed"""
+        path = _find_lbp_cascade(filename)
+        if path is None:
+            _report_missing_model(filename, f"LBP cascade {filename} not found - LBP detection will not use it")
+            return None, None
+        
+        cascade, lock = _get_cascade(path)
+        if cascade.empty():
+            logger.warning(f"Could not load LBP cascade {filename}")
+            return None, None
+        return cascade, lock
 
-    def extract_faces_haar(self, image_path: str) -> list[dict[str, any]]:
+    def _init_gpu_cascades(self):
+        """
+        Load the LBP cascades on the GPU if CUDA is available.
+        LBP is used since the CUDA loader does not support the current Haar cascade format.
+        """
+        if self.lbp_cascade is None:
+            return
+        
+        try:
+            if not hasattr(cv2, 'cuda_CascadeClassifier') or cv2.cuda.getCudaEnabledDeviceCount() == 0:
+                return
+            
+            self.gpu_lbp_cascade = cv2.cuda_CascadeClassifier.create(_find_lbp_cascade('lbpcascade_frontalface_improved.xml'))
+            if self.lbp_profile_cascade is not None:
+                self.gpu_lbp_profile_cascade = cv2.cuda_CascadeClassifier.create(_find_lbp_cascade('lbpcascade_profileface.xml'))
+            logger.info("CUDA is available - LBP detection will run on the GPU")
+            
+        except Exception as e:
+            logger.warning(f"Could not initialize GPU cascades: {str(e)} - LBP detection will run on the CPU")
+            self.gpu_lbp_cascade = None
+            self.gpu_lbp_profile_cascade = None
+
+    def _warmup(self):
+        """
+        Run every loaded detector once on a blank image so the first real request does not pay
+        for lazy initialization (classifier stages, buffers, backend setup).
+        The shared DNN model is already warmed up by the forward pass in _select_dnn_backend.
+        """
+        blank = np.zeros((100, 100), np.uint8)
+        for cascade, lock in ((self.face_cascade, self._face_cascade_lock),
+                              (self.profile_cascade, self._profile_cascade_lock),
+                              (self.lbp_cascade, self._lbp_cascade_lock),
+                              (self.lbp_profile_cascade, self._lbp_profile_cascade_lock)):
+            if cascade is not None:
+                self._run_cascade(cascade, lock, blank, self._scan_params(blank.shape))
+        
+        if self.yunet_detector is not None:
+            try:
+                with self._yunet_lock:
+                    self.yunet_detector.setInputSize((320, 320))
+                    self.yunet_detector.detect(np.zeros((320, 320, 3), np.uint8))
+            except Exception as e:
+                logger.warning(f"YuNet warmup failed: {str(e)}")
+
+    def _select_dnn_backend(self, dnn_net: cv2.dnn.Net, prefer_fp16: bool = False) -> cv2.dnn.Net | None:
+        """
+        Run the DNN model on the fastest backend/target supported by this OpenCV build.
+        Candidates are tried in order (CUDA, OpenCL FP16, OpenCL, CPU); each one is checked with a forward
+        pass on an empty blob since unsupported backends only fail when the network runs.
+        
+        Args:
+            dnn_net: The loaded network
+            prefer_fp16 (bool): Try the FP16 CPU target before the FP32 one (used for the quantized model)
+            
+        Returns:
+            The network set up for the first working candidate, or None if it runs on none of them
+        """
+        candidates = []
+        
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                candidates.append(('CUDA/FP16', cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA_FP16))
+        except Exception:
+            # OpenCV builds without CUDA support may not expose the cuda module at all
+            pass
+        
+        if cv2.ocl.haveOpenCL():
+            # OpenCV's own backend runs on OpenCL in every build (the pip wheels ship no Inference Engine)
+            candidates.append(('OpenCV/OpenCL FP16', cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_OPENCL_FP16))
+            candidates.append(('OpenCV/OpenCL', cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_OPENCL))
+        
+        if prefer_fp16 and hasattr(cv2.dnn, 'DNN_TARGET_CPU_FP16'):
+            candidates.append(('OpenCV/CPU FP16', cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU_FP16))
+        
+        candidates.append(('OpenCV/CPU', cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU))
+        
+        probe = np.zeros((1, 3, 300, 300), np.float32)
+        for name, backend, target in candidates:
+            try:
+                dnn_net.setPreferableBackend(backend)
+                dnn_net.setPreferableTarget(target)
+                dnn_net.setInput(probe)
+                dnn_net.forward()
+                logger.info(f"DNN face detection running on backend/target: {name}")
+                return dnn_net
+            except Exception as e:
+                # Falling back to the next candidate is expected on most machines
+                logger.debug(f"DNN backend/target {name} is not available: {str(e)}")
+        
+        logger.warning("DNN model could not run on any backend - DNN detection will not be available")
+        return None
+
+    def _load_image(self, image: str | bytes | np.ndarray) -> np.ndarray:
+        """
+        Decode an image from disk or from encoded bytes, or pass through an already decoded one.
+        
+        Args:
+            image: Path to the image file, encoded image bytes or an already decoded BGR image
+            
+        Returns:
+            np.ndarray: BGR image
+        """
+        if isinstance(image, np.ndarray):
+            return image
+        
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            # Decode straight from memory without going through a temporary file
+            bgr = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+            if bgr is None:
+                raise ValueError("Could not decode image bytes")
+            return bgr
+        
+        # Validate image file exists
+        if not os.path.exists(image):
+            raise FileNotFoundError(f"Image file not found: {image}")
+        
+        cache_key = (os.path.abspath(image), os.path.getmtime(image))
+        with self._image_cache_lock:
+            bgr = self._image_cache.get(cache_key)
+            if bgr is not None:
+                self._image_cache.move_to_end(cache_key)
+                return bgr
+        
+        # Read the file in one go and decode it from memory
+        bgr = cv2.imdecode(np.fromfile(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError(f"Could not read image: {image}")
+        
+        # The cached array is shared between callers, so it must not be modified in place
+        bgr.setflags(write=False)
+        with self._image_cache_lock:
+            self._image_cache[cache_key] = bgr
+            while len(self._image_cache) > self._image_cache_size:
+                self._image_cache.popitem(last=False)
+        
+        return bgr
+
+    def _decode(self, image: str | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Decode an image once and return both its BGR and grayscale representations.
+        
+        Args:
+            image: Path to the image file or an already decoded BGR image
+            
+        Returns:
+            tuple[np.ndarray, np.ndarray]: BGR image and its grayscale conversion
+        """
+        bgr = self._load_image(image)
+        
+        source = cv2.UMat(bgr) if self.use_opencl else bgr
+        if self.fast_gray:
+            # The green channel carries most of the luminance and needs no arithmetic to extract
+            gray = cv2.extractChannel(source, 1)
+        else:
+            gray = cv2.cvtColor(source, cv2.COLOR_BGR2GRAY)
+        
+        return bgr, gray.get() if self.use_opencl else gray
+
+    @staticmethod
+    def _describe(image: str | np.ndarray) -> str:
+        """Return a short description of the image source for log messages"""
+        if isinstance(image, np.ndarray):
+            return f"in-memory image ({image.shape[1]}x{image.shape[0]})"
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return f"in-memory image bytes ({len(image)} bytes)"
+        return image
+
+    def extract_faces(self, image: str | np.ndarray, confidence_threshold: float = 0.5,
+                      compute_confidence: bool = True) -> list[dict[str, any]]:
+        """
+        Extract faces with the best available detector: a single ResNet-SSD forward pass when the
+        DNN model is loaded, otherwise the configured (LBP or Haar) cascades.
+        
+        Args:
+            image (str | np.ndarray): Path to the image file or an already decoded BGR image
+            confidence_threshold (float): Minimum confidence threshold (only used for DNN detection)
+            compute_confidence (bool): Score cascade detections; when False they are reported with
+                confidence 1.0 (DNN confidences come from the network and are always returned)
+            
+        Returns:
+            list[dict[str, any]]: List of face detection results with bounding box and confidence info
+        """
+        if self.dnn_net is not None:
+            return self.extract_faces_dnn(image, confidence_threshold)
+        if self.detector == 'lbp':
+            return self.extract_faces_lbp(image, compute_confidence)
+        return self.extract_faces_haar(image, compute_confidence)
+
+    def extract_faces_haar(self, image: str | np.ndarray, compute_confidence: bool = True) -> list[dict[str, any]]:
         """
         Extract faces from an image using Haar cascade classifiers and return face detection information.
         
         Args:
-            image_path (str): Path to the image file
+            image (str | np.ndarray): Path to the image file or an already decoded BGR image
+            compute_confidence (bool): Score each face; when False all faces get confidence 1.0
             
         Returns:
             list[dict[str, any]]: List of face detection results with bounding box and confidence info
         """
         try:
-            # Validate image file exists
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-            
-            # Read the image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Could not read image: {image_path}")
-            
-            # Convert to grayscale for face detection
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Detect faces
-            faces = []
-            
-            # Detect frontal faces
-            frontal_faces = self.face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(30, 30),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
-            
-            # Add frontal faces to results
-            for (x, y, w, h) in frontal_faces:
-                faces.append({
-                    'bbox_x': int(x),
-                    'bbox_y': int(y),
-                    'bbox_width': int(w),
-                    'bbox_height': int(h),
-                    'confidence': self._calculate_haar_confidence(gray, x, y, w, h),
-                    'detection_type': 'frontal'
-                })
-            
-            # Detect profile faces if cascade is available
-            if self.profile_cascade is not None:
-                profile_faces = self.profile_cascade.detectMultiScale(
-                    gray,
-                    scaleFactor=1.1,
-                    minNeighbors=5,
-                    minSize=(30, 30),
-                    flags=cv2.CASCADE_SCALE_IMAGE
-                )
-                
-                # Add profile faces to results (avoid duplicates)
-                for (x, y, w, h) in profile_faces:
-                    # Check if this face overlaps significantly with any existing face
-                    if not self._is_duplicate_face(faces, x, y, w, h):
-                        faces.append({
-                            'bbox_x': int(x),
-                            'bbox_y': int(y),
-                            'bbox_width': int(w),
-                            'bbox_height': int(h),
-                            'confidence': self._calculate_haar_confidence(gray, x, y, w, h),
-                            'detection_type': 'profile'
-                        })
-            
-            logger.info(f"Detected {len(faces)} faces in image: {image_path}")
+            _, gray = self._decode(image)
+            faces = self._to_face_dicts(self._detect_faces_haar(gray, compute_confidence=compute_confidence))
+            
+            logger.info(f"Detected {len(faces)} faces in image: {self._describe(image)}")
+            return faces
+            
+        except Exception as e:
+            logger.error(f"Error extracting faces from {self._describe(image)}: {str(e)}")
+            raise
+
+    def _detect_faces_haar(self, gray: np.ndarray, use_lbp: bool = False, compute_confidence: bool = True) -> Detections:
+        """
+        Run the Haar (or LBP) cascade classifiers on a grayscale image.
+        
+        Args:
+            gray: Grayscale image as numpy array
+            use_lbp: Use the LBP cascades instead of the Haar ones
+            compute_confidence: Score each face; when False all faces get confidence 1.0
+            
+        Returns:
+            Detections: Bounding boxes, confidence scores and detection types
+        """
+        if use_lbp:
+            frontal_cascade, frontal_lock = self.lbp_cascade, self._lbp_cascade_lock
+            profile_cascade, profile_lock = self.lbp_profile_cascade, self._lbp_profile_cascade_lock
+        else:
+            frontal_cascade, frontal_lock = self.face_cascade, self._face_cascade_lock
+            profile_cascade, profile_lock = self.profile_cascade, self._profile_cascade_lock
+        
+        # Run the cascades on a downscaled, histogram-equalized copy of large images. Confidences are
+        # computed on the original gray image, so equalization does not change them
+        small_gray, scale = self._prepare_for_detection(gray)
+        small_gray = cv2.equalizeHist(small_gray)
+        scan_params = self._scan_params(small_gray.shape)
+        # The cascades dispatch to OpenCL when given a UMat
+        scan_input = cv2.UMat(small_gray) if self.use_opencl else small_gray
+        
+        frontal_job = (self._run_cascade, frontal_cascade, frontal_lock, scan_input)
+        profile_job = (self._run_cascade, profile_cascade, profile_lock, scan_input) if profile_cascade is not None else None
+        
+        if use_lbp and self.gpu_lbp_cascade is not None:
+            # Upload the image once and share it between both GPU cascades
+            gpu_input = cv2.cuda_GpuMat()
+            gpu_input.upload(small_gray)
+            frontal_job = (self._run_gpu_cascade, self.gpu_lbp_cascade, frontal_lock, gpu_input)
+            if self.gpu_lbp_profile_cascade is not None:
+                profile_job = (self._run_gpu_cascade, self.gpu_lbp_profile_cascade, profile_lock, gpu_input)
+        
+        # Detect frontal and profile faces (if cascade is available) concurrently
+        frontal_future = self._cascade_executor.submit(*frontal_job, scan_params)
+        profile_future = self._cascade_executor.submit(*profile_job, scan_params) if profile_job is not None else None
+        
+        # Compute the edge map for confidence scoring while the cascades are running
+        edges = self._edge_map(gray) if compute_confidence else None
+        
+        frontal_faces = frontal_future.result()
+        profile_faces = profile_future.result() if profile_future is not None else ()
+        
+        # Collect all candidates from both cascades
+        boxes = np.array([*frontal_faces, *profile_faces], np.int32).reshape(-1, 4)
+        types = ['frontal'] * len(frontal_faces) + ['profile'] * len(profile_faces)
+        if not types:
+            return self._empty_detections()
+        
+        # Map boxes back to the original image and score them there, so confidences reflect its resolution
+        boxes = np.round(boxes / scale).astype(np.int32)
+        
+        # Drop flat candidates before spending any time on scoring them
+        textured = self._textured_mask(gray, boxes)
+        if not textured.all():
+            boxes = boxes[textured]
+            types = [detection_type for detection_type, keep in zip(types, textured) if keep]
+            if not types:
+                return self._empty_detections()
+        
+        if compute_confidence:
+            scores = self._calculate_haar_confidences(gray, edges, boxes)
+        else:
+            scores = np.ones(len(boxes))
+        
+        # Remove overlapping detections across (and within) both cascades in a single pass. Frontal
+        # boxes rank above every profile box, so a (larger) profile box never replaces a frontal face
+        ranking = scores + np.array([detection_type == 'frontal' for detection_type in types])
+        return self._apply_nms(Detections(boxes, scores, types), ranking=ranking)
+    
+    @staticmethod
+    def _empty_detections() -> Detections:
+        """Return a detection result with no faces"""
+        return Detections(np.empty((0, 4), np.int32), np.empty(0, np.float64), [])
+    
+    @staticmethod
+    def _to_face_dicts(detections: Detections) -> list[dict[str, any]]:
+        """
+        Convert internal detection arrays into the face dictionaries returned by the public API.
+        
+        Args:
+            detections: Bounding boxes, confidence scores and detection types
+            
+        Returns:
+            List of detected faces with bounding boxes and confidence scores
+        """
+        return [
+            {
+                'bbox_x': int(box[0]),
+                'bbox_y': int(box[1]),
+                'bbox_width': int(box[2]),
+                'bbox_height': int(box[3]),
+                'confidence': float(score),
+                'detection_type': detection_type
+            }
+            for box, score, detection_type in zip(detections.boxes.tolist(), detections.scores.tolist(), detections.types)
+        ]
+    
+    @staticmethod
+    def _run_cascade(cascade: cv2.CascadeClassifier, lock: threading.Lock, image: np.ndarray,
+                     scan_params: dict[str, any]) -> np.ndarray:
+        """Run a shared cascade classifier on an image while holding its lock"""
+        with lock:
+            return cascade.detectMultiScale(image, **scan_params)
+    
+    @staticmethod
+    def _run_gpu_cascade(gpu_cascade, lock: threading.Lock, gpu_image, scan_params: dict[str, any]) -> np.ndarray:
+        """Run a CUDA cascade classifier on an image already uploaded to the GPU"""
+        with lock:
+            gpu_cascade.setScaleFactor(scan_params['scaleFactor'])
+            gpu_cascade.setMinNeighbors(scan_params['minNeighbors'])
+            gpu_cascade.setMinObjectSize(scan_params['minSize'])
+            gpu_cascade.setMaxObjectSize(scan_params['maxSize'])
+            objects = gpu_cascade.detectMultiScale(gpu_image)
+            return np.array(gpu_cascade.convert(objects), np.int32).reshape(-1, 4)
+    
+    def _scan_params(self, shape: tuple[int, ...]) -> dict[str, any]:
+        """
+        Pick the detectMultiScale parameters for an image of the given size.
+        Faces smaller than min_face_ratio of the image are not searched for, which removes the
+        most expensive pyramid levels on large images. Faces larger than the shorter side cannot
+        fit in the image and are not searched for either.
+        
+        Args:
+            shape: Shape of the (possibly downscaled) grayscale image that will be scanned
+            
+        Returns:
+            Keyword arguments for CascadeClassifier.detectMultiScale
+        """
+        scale_factor, min_neighbors, min_size, max_size = _scan_params_for_size(shape[0], shape[1], self.min_face_ratio)
+        return {
+            'scaleFactor': scale_factor,
+            'minNeighbors': min_neighbors,
+            'minSize': min_size,
+            'maxSize': max_size,
+            'flags': cv2.CASCADE_SCALE_IMAGE
+        }
+    
+    def extract_faces_lbp(self, image: str | np.ndarray, compute_confidence: bool = True) -> list[dict[str, any]]:
+        """
+        Extract faces from an image using LBP cascade classifiers.
+        LBP features are integer-only lookups, so detection is faster than with Haar cascades.
+        
+        Args:
+            image (str | np.ndarray): Path to the image file or an already decoded BGR image
+            compute_confidence (bool): Score each face; when False all faces get confidence 1.0
+            
+        Returns:
+            list[dict[str, any]]: List of face detection results with bounding box and confidence info
+            
+        Raises:
+            Exception: If LBP cascade is not available
+        """
+        if self.lbp_cascade is None:
+            raise Exception("LBP cascade is not available. Please ensure lbpcascade_frontalface_improved.xml is present in the models directory.")
+        
+        try:
+            _, gray = self._decode(image)
+            faces = self._to_face_dicts(self._detect_faces_haar(gray, use_lbp=True, compute_confidence=compute_confidence))
+            
+            logger.info(f"Detected {len(faces)} faces using LBP in image: {self._describe(image)}")
             return faces
             
         except Exception as e:
-            logger.error(f"Error extracting faces from {image_path}: {str(e)}")
+            logger.error(f"Error extracting faces with LBP from {self._describe(image)}: {str(e)}")
             raise
     
-    def extract_faces_dnn(self, image_path: str, confidence_threshold: float = 0.5) -> list[dict[str, any]]:
+    def _prepare_for_detection(self, image: np.ndarray) -> tuple[np.ndarray, float]:
+        """
+        Downscale an image so its longest side is at most max_detection_side.
+        Detection cost grows with the number of pixels, so large photos are scanned at a smaller size.
+        
+        Args:
+            image: Input image as numpy array
+            
+        Returns:
+            tuple[np.ndarray, float]: Image to run detection on and the scale factor applied to it
+                (divide detected coordinates by the scale to map them back to the original image)
+        """
+        longest_side = max(image.shape[:2])
+        if not self.max_detection_side or longest_side <= self.max_detection_side:
+            return image, 1.0
+        
+        scale = self.max_detection_side / longest_side
+        # INTER_AREA averages the source pixels, which avoids aliasing when shrinking
+        resized = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return resized, scale
+    
+    def extract_faces_dnn(self, image: str | np.ndarray, confidence_threshold: float = 0.5) -> list[dict[str, any]]:
         """
         Extract faces from an image using OpenCV DNN (Deep Neural Network).
         This method provides more accurate face detection than Haar cascades.
         
         Args:
-            image_path (str): Path to the image file
+            image (str | np.ndarray): Path to the image file or an already decoded BGR image
             confidence_threshold (float): Minimum confidence threshold for face detection (0.0-1.0)
             
         Returns:
@@ -160,25 +737,63 @@ class FaceExtractionService:
             raise Exception("DNN model is not available. Please ensure model files are present in the models directory.")
         
         try:
-            # Validate image file exists
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-            
-            # Read the image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Could not read image: {image_path}")
+            faces = self._to_face_dicts(self._detect_faces_with_dnn(self._load_image(image), confidence_threshold))
             
-            faces = self._detect_faces_with_dnn(image, confidence_threshold)
-            
-            logger.info(f"Detected {len(faces)} faces using DNN in image: {image_path}")
+            logger.info(f"Detected {len(faces)} faces using DNN in image: {self._describe(image)}")
             return faces
             
         except Exception as e:
-            logger.error(f"Error extracting faces with DNN from {image_path}: {str(e)}")
+            logger.error(f"Error extracting faces with DNN from {self._describe(image)}: {str(e)}")
             raise
 
-    def _detect_faces_with_dnn(self, image: np.ndarray, confidence_threshold: float) -> list[dict[str, any]]:
+    def extract_faces_dnn_batch(self, images: list[str | np.ndarray], confidence_threshold: float = 0.5,
+                                batch_size: int = 16) -> list[list[dict[str, any]]]:
+        """
+        Extract faces from several images using OpenCV DNN, running one forward pass per batch
+        of images instead of one per image.
+        
+        Args:
+            images (list[str | np.ndarray]): Paths to the image files or already decoded BGR images
+            confidence_threshold (float): Minimum confidence threshold for face detection (0.0-1.0)
+            batch_size (int): Maximum number of images sent through the network in a single forward pass
+            
+        Returns:
+            list[list[dict[str, any]]]: Face detection results for each image, in input order
+            
+        Raises:
+            Exception: If DNN model is not available
+        """
+        if self.dnn_net is None:
+            raise Exception("DNN model is not available. Please ensure model files are present in the models directory.")
+        
+        results = []
+        for start in range(0, len(images), batch_size):
+            batch = [self._load_image(image) for image in images[start:start + batch_size]]
+            sizes = [image.shape[:2] for image in batch]
+            
+            try:
+                # Build a single 4-D blob for the whole batch
+                blob = cv2.dnn.blobFromImages(batch, 1.0, (300, 300), DNN_MEAN, swapRB=False, crop=False)
+                with self._dnn_lock:
+                    self.dnn_net.setInput(blob)
+                    detections = self.dnn_net.forward()
+            except Exception as e:
+                logger.error(f"Error in batched DNN detection: {str(e)}")
+                raise
+            
+            # Release the decoded images and the blob before the next batch is decoded
+            del batch, blob
+            
+            # Column 0 of each detection holds the index of the image it belongs to
+            rows = detections[0, 0]
+            batch_ids = rows[:, 0].astype(int)
+            for index, (h, w) in enumerate(sizes):
+                results.append(self._to_face_dicts(self._parse_dnn_detections(rows[batch_ids == index], w, h, confidence_threshold)))
+        
+        logger.info(f"DNN batch detected {sum(len(faces) for faces in results)} faces in {len(images)} images")
+        return results
+
+    def _detect_faces_with_dnn(self, image: np.ndarray, confidence_threshold: float) -> Detections:
         """
         Use OpenCV DNN model for face detection.
         
@@ -187,141 +802,241 @@ class FaceExtractionService:
             confidence_threshold: Minimum confidence threshold
             
         Returns:
-            List of detected faces with bounding boxes and confidence scores
+            Detections: Bounding boxes, confidence scores and detection types
         """
-        faces = []
-        
         try:
             (h, w) = image.shape[:2]
             
-            # Create blob from image
-            # The OpenCV face detector expects input size of 300x300
-            blob = cv2.dnn.blobFromImage(image, 1.0, (300, 300), [104, 117, 123])
+            with self._dnn_lock:
+                # The OpenCV face detector expects input size of 300x300
+                # Resize into the preallocated buffer so no new image is allocated per call
+                resized = cv2.resize(image, (300, 300), dst=self._dnn_input_buffer, interpolation=cv2.INTER_LINEAR)
+                
+                # Create blob from image (already at the network input size, so no resize happens here)
+                blob = cv2.dnn.blobFromImage(resized, 1.0, (300, 300), DNN_MEAN, swapRB=False, crop=False)
+                
+                # Set the blob as input to the network
+                self.dnn_net.setInput(blob)
+                
+                # Run forward pass to get detections
+                detections = self.dnn_net.forward()
             
-            # Set the blob as input to the network
-            self.dnn_net.setInput(blob)
+            faces = self._parse_dnn_detections(detections[0, 0], w, h, confidence_threshold)
             
-            # Run forward pass to get detections
-            detections = self.dnn_net.forward()
-            
-            # Loop through the detections
-            for i in range(detections.shape[2]):
-                confidence = detections[0, 0, i, 2]
-                
-                # Filter weak detections
-                if confidence > confidence_threshold:
-                    # Get bounding box coordinates
-                    box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                    (x, y, x1, y1) = box.astype("int")
-                    
-                    # Ensure coordinates are within image bounds
-                    x = max(0, x)
-                    y = max(0, y)
-                    x1 = min(w, x1)
-                    y1 = min(h, y1)
-                    
-                    # Calculate width and height
-                    width = x1 - x
-                    height = y1 - y
-                    
-                    # Only add valid detections
-                    if width > 0 and height > 0:
-                        faces.append({
-                            'bbox_x': int(x),
-                            'bbox_y': int(y),
-                            'bbox_width': int(width),
-                            'bbox_height': int(height),
-                            'confidence': round(float(confidence), 3),
-                            'detection_type': 'dnn'
-                        })
-            
-            logger.info(f"DNN detected {len(faces)} faces with confidence > {confidence_threshold}")
+            logger.info(f"DNN detected {len(faces.types)} faces with confidence > {confidence_threshold}")
             
         except Exception as e:
             logger.error(f"Error in DNN detection: {str(e)}")
             raise
             
         return faces
-    
-    def _calculate_haar_confidence(self, gray_image: np.ndarray, x: int, y: int, w: int, h: int) -> float:
+
+    def extract_faces_yunet(self, image: str | np.ndarray, confidence_threshold: float = 0.5) -> list[dict[str, any]]:
         """
-        Calculate a confidence score for the detected face using Haar cascade metrics.
-        This is a simplified approach since Haar cascades don't provide confidence directly.
+        Extract faces from an image using the OpenCV YuNet detector.
+        YuNet is faster than the Haar cascades and returns real confidence scores.
         
         Args:
-            gray_image: Grayscale image
-            x, y, w, h: Bounding box coordinates
+            image (str | np.ndarray): Path to the image file or an already decoded BGR image
+            confidence_threshold (float): Minimum confidence threshold for face detection (0.0-1.0)
             
         Returns:
-            float: Confidence score between 0.0 and 1.0
+            list[dict[str, any]]: List of face detection results with bounding box and confidence info
+            
+        Raises:
+            Exception: If YuNet model is not available
         """
+        if self.yunet_detector is None:
+            raise Exception("YuNet model is not available. Please ensure the model file is present in the models directory.")
+        
         try:
-            # Extract face region
-            face_region = gray_image[y:y+h, x:x+w]
-            
-            # Calculate metrics that might indicate face quality
-            # 1. Size factor (larger faces tend to be more reliable)
-            size_factor = min(1.0, (w * h) / (100 * 100))  # Normalize to 100x100 baseline
+            faces = self._to_face_dicts(self._detect_faces_yunet(self._load_image(image), confidence_threshold))
             
-            # 2. Contrast factor (faces with good contrast are more reliable)
-            contrast = np.std(face_region) / 255.0  # Normalize standard deviation
-            
-            # 3. Edge density (faces should have reasonable edge content)
-            edges = cv2.Canny(face_region, 50, 150)
-            edge_density = np.sum(edges > 0) / (w * h)
-            
-            # Combine factors into a confidence score
-            confidence = (size_factor * 0.3 + 
-                         min(contrast, 1.0) * 0.4 + 
-                         min(edge_density * 10, 1.0) * 0.3)
-            
-            # Ensure confidence is between 0.5 and 1.0 for detected faces
-            confidence = max(0.5, min(1.0, confidence))
-            
-            return round(confidence, 3)
+            logger.info(f"Detected {len(faces)} faces using YuNet in image: {self._describe(image)}")
+            return faces
             
         except Exception as e:
-            logger.warning(f"Error calculating Haar confidence: {str(e)}")
-            return 0.7  # Default moderate confidence
+            logger.error(f"Error extracting faces with YuNet from {self._describe(image)}: {str(e)}")
+            raise
 
-    def _is_duplicate_face(self, existing_faces: list[dict[str, any]], x: int, y: int, w: int, h: int) -> bool:
+    def _detect_faces_yunet(self, image: np.ndarray, confidence_threshold: float) -> Detections:
         """
-        Check if a detected face significantly overlaps with any existing face.
+        Run the YuNet detector on a BGR image.
         
         Args:
-            existing_faces: List of already detected faces
-            x, y, w, h: Bounding box of the new face
+            image: Input image as numpy array
+            confidence_threshold: Minimum confidence threshold
             
         Returns:
-            bool: True if this face is likely a duplicate
+            Detections: Bounding boxes, confidence scores and detection types
         """
-        threshold = 0.3  # 30% overlap threshold
+        (h, w) = image.shape[:2]
+        small, scale = self._prepare_for_detection(image)
+        
+        with self._yunet_lock:
+            self.yunet_detector.setInputSize((small.shape[1], small.shape[0]))
+            self.yunet_detector.setScoreThreshold(confidence_threshold)
+            _, detections = self.yunet_detector.detect(small)
+        
+        if detections is None or len(detections) == 0:
+            return self._empty_detections()
+        
+        # Each row is [x, y, w, h, 5 landmark points, score]
+        x0 = np.clip(detections[:, 0] / scale, 0, w)
+        y0 = np.clip(detections[:, 1] / scale, 0, h)
+        x1 = np.clip((detections[:, 0] + detections[:, 2]) / scale, 0, w)
+        y1 = np.clip((detections[:, 1] + detections[:, 3]) / scale, 0, h)
+        boxes = np.stack([x0, y0, x1 - x0, y1 - y0], axis=1).astype(np.int32)
         
-        for face in existing_faces:
-            # Calculate intersection over union (IoU)
-            i_x = max(face['bbox_x'], x)
-            i_y = max(face['bbox_y'], y)
-            i_x1 = min(face['bbox_x'] + face['bbox_width'], x + w)
-            i_y1 = min(face['bbox_y'] + face['bbox_height'], y + h)
+        valid = (boxes[:, 2] > 0) & (boxes[:, 3] > 0)
+        return Detections(
+            boxes=boxes[valid],
+            scores=np.round(detections[valid, -1].astype(np.float64), 3),
+            types=['yunet'] * int(valid.sum())
+        )
+
+    def _parse_dnn_detections(self, rows: np.ndarray, w: int, h: int, confidence_threshold: float) -> Detections:
+        """
+        Convert raw DNN detection rows into face results scaled to the image size.
+        
+        Args:
+            rows: Detection rows of shape (N, 7) - [batch_id, class_id, confidence, x0, y0, x1, y1]
+            w, h: Width and height of the image the detections belong to
+            confidence_threshold: Minimum confidence threshold
             
-            # Calculate intersection area
-            intersection = max(0, i_x1 - i_x) * max(0, i_y1 - i_y)
+        Returns:
+            Detections: Bounding boxes, confidence scores and detection types
+        """
+        # Filter weak detections
+        rows = rows[rows[:, 2] > confidence_threshold]
+        
+        # Scale the corner coordinates to the image and keep them within image bounds
+        corners = np.clip(rows[:, 3:7] * np.array([w, h, w, h]), 0, [w, h, w, h]).astype(np.int32)
+        boxes = np.column_stack([corners[:, :2], corners[:, 2:] - corners[:, :2]])
+        
+        # Only keep valid detections
+        valid = (boxes[:, 2] > 0) & (boxes[:, 3] > 0)
+        return Detections(
+            boxes=boxes[valid],
+            scores=np.round(rows[valid, 2].astype(np.float64), 3),
+            types=['dnn'] * int(valid.sum())
+        )
+    
+    @staticmethod
+    def _textured_mask(gray_image: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        """
+        Flag the boxes whose region has enough intensity entropy to plausibly contain a face.
+        
+        Args:
+            gray_image: Grayscale image
+            boxes: (N, 4) array of [x, y, width, height] boxes
             
-            # Calculate union area
-            union = (face['bbox_width'] * face['bbox_height']) + (w * h) - intersection
+        Returns:
+            np.ndarray: Boolean mask, True for boxes to keep
+        """
+        histograms = np.array([
+            cv2.calcHist([gray_image[y:y+h, x:x+w]], [0], None, [16], [0, 256]).ravel()
+            for x, y, w, h in boxes
+        ])
+        probabilities = histograms / np.maximum(histograms.sum(axis=1, keepdims=True), 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            entropies = -np.where(probabilities > 0, probabilities * np.log2(probabilities), 0).sum(axis=1)
+        return entropies >= MIN_FACE_ENTROPY
+    
+    @staticmethod
+    def _edge_map(gray_image: np.ndarray) -> np.ndarray:
+        """
+        Find edges for the whole image once, with the Canny thresholds the per-face scoring used.
+        Edge densities only differ from per-face Canny near the face borders.
+        
+        Args:
+            gray_image: Grayscale image
             
-            # Calculate IoU
-            iou = intersection / union if union > 0 else 0
+        Returns:
+            np.ndarray: Boolean edge mask with the same size as the image
+        """
+        return cv2.Canny(gray_image, 50, 150) > 0
+    
+    def _calculate_haar_confidences(self, gray_image: np.ndarray, edges: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        """
+        Calculate a confidence score for each detected face using Haar cascade metrics.
+        This is a simplified approach since Haar cascades don't provide confidence directly.
+        Per-face sums come from integral images built once per image, so each face costs
+        four lookups instead of a pass over its pixels.
+        
+        Args:
+            gray_image: Grayscale image
+            edges: Edge mask of the image from _edge_map
+            boxes: Array of shape (N, 4) with the [x, y, width, height] of each face
+            
+        Returns:
+            np.ndarray: Confidence score between 0.5 and 1.0 for each face
+        """
+        # 1. Size factor (larger faces tend to be more reliable)
+        size_factors = np.minimum(1.0, (boxes[:, 2] * boxes[:, 3]) / (100 * 100))  # Normalize to 100x100 baseline
+        
+        # Box corners, kept within the image
+        height, width = gray_image.shape[:2]
+        x0 = np.clip(boxes[:, 0], 0, width)
+        y0 = np.clip(boxes[:, 1], 0, height)
+        x1 = np.clip(boxes[:, 0] + boxes[:, 2], 0, width)
+        y1 = np.clip(boxes[:, 1] + boxes[:, 3], 0, height)
+        areas = np.maximum((x1 - x0) * (y1 - y0), 1)
+        
+        def box_sums(integral: np.ndarray) -> np.ndarray:
+            return integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+        
+        sums, squared_sums = cv2.integral2(gray_image, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        edge_sums = cv2.integral(edges.view(np.uint8))
+        
+        # 2. Contrast factor (faces with good contrast are more reliable)
+        means = box_sums(sums) / areas
+        variances = np.maximum(box_sums(squared_sums) / areas - means * means, 0)
+        contrasts = np.sqrt(variances) / 255.0  # Normalize standard deviation
+        
+        # 3. Edge density (faces should have reasonable edge content)
+        edge_densities = box_sums(edge_sums) / areas
+        
+        # Combine factors into a confidence score
+        confidences = (size_factors * 0.3 +
+                       np.minimum(contrasts, 1.0) * 0.4 +
+                       np.minimum(edge_densities * 10, 1.0) * 0.3)
+        
+        # Ensure confidence is between 0.5 and 1.0 for detected faces
+        return np.round(np.clip(confidences, 0.5, 1.0), 3)
+
+    def _apply_nms(self, detections: Detections, overlap_threshold: float = 0.3,
+                   ranking: np.ndarray | None = None) -> Detections:
+        """
+        Apply non-maximum suppression to overlapping face detections using OpenCV's C++ implementation.
+        
+        Args:
+            detections: Bounding boxes, confidence scores and detection types
+            overlap_threshold: Intersection over union (IoU) above which the weaker detection is dropped
+            ranking: Values deciding which of two overlapping detections is kept (default: their scores)
             
-            # Check if IoU exceeds the threshold
-            if iou > threshold:
-                return True  # Duplicate face detected
+        Returns:
+            Detections: The detections that were kept, in their original order
+        """
+        if not detections.types:
+            return detections
         
-        return False  # No significant overlap with existing faces
+        if ranking is None:
+            ranking = detections.scores
+        keep = cv2.dnn.NMSBoxes(detections.boxes.tolist(), ranking.tolist(),
+                                score_threshold=0.0, nms_threshold=overlap_threshold)
+        keep = sorted(int(index) for index in np.array(keep).flatten())
+        return Detections(
+            boxes=detections.boxes[keep],
+            scores=detections.scores[keep],
+            types=[detections.types[index] for index in keep]
+        )
 
     def validate_image(self, image_path: str) -> bool:
         """
         Validate if the image at the given path is a valid image file and can be read by OpenCV.
+        The decoded image is kept in the image cache, so extracting faces from it right after
+        validation does not decode the file again.
         
         Args:
             image_path (str): Path to the image file
@@ -330,35 +1045,37 @@ class FaceExtractionService:
             bool: True if image is valid and readable, False otherwise
         """
         try:
-            # Attempt to open the image file
-            image = cv2.imread(image_path)
-            
-            # If image is None, it means OpenCV could not read the file
-            if image is None:
-                logger.warning(f"Invalid image file (cannot be read): {image_path}")
-                return False
-            
+            self._load_image(image_path)
             return True
         
+        except ValueError:
+            # OpenCV could not decode the file
+            logger.warning(f"Invalid image file (cannot be read): {image_path}")
+            return False
+        
         except Exception as e:
             logger.warning(f"Error validating image file {image_path}: {str(e)}")
             return False
 
-    def extract_faces_with_method(self, image_path: str, method: str, confidence_threshold: float = 0.5) -> list[dict[str, any]]:
+    def extract_faces_with_method(self, image: str | bytes | np.ndarray, method: str, confidence_threshold: float = 0.5,
+                                  compute_confidence: bool = True) -> list[dict[str, any]]:
         """
         Extract faces using the specified detection method.
+        The image is decoded once and the decoded array is handed to the detector.
+        Results for image files are kept in a small LRU cache until the file changes.
         
         Args:
-            image_path (str): Path to the image file
+            image (str | bytes | np.ndarray): Path to the image file, encoded image bytes or an already decoded BGR image
             method (str): Detection method - use DetectionMethodChoices values (required)
-            confidence_threshold (float): Minimum confidence threshold (only used for DNN method)
+            confidence_threshold (float): Minimum confidence threshold (only used for DNN and YuNet methods)
+            compute_confidence (bool): Score cascade (Haar/LBP) detections; when False they get confidence 1.0
             
         Returns:
             list[dict[str, any]]: List of face detection results
             
         Raises:
             ValueError: If method is None, empty, or not a valid detection method
-            Exception: If DNN method is requested but model is not available
+            Exception: If DNN, YuNet or LBP method is requested but model is not available
         """
         # Check if method is provided and not empty
         if not method:
@@ -370,10 +1087,233 @@ class FaceExtractionService:
         if method not in valid_methods:
             raise ValueError(f"Invalid detection method: '{method}'. Available methods: {valid_methods}")
         
-        # Execute the appropriate detection method
+        # Results for files are cached; in-memory images are always detected
+        cache_key = None
+        if isinstance(image, str):
+            abs_path = os.path.abspath(image)
+            if os.path.exists(abs_path):
+                cache_key = (abs_path, os.path.getmtime(abs_path), method, float(confidence_threshold), compute_confidence)
+                with self._result_cache_lock:
+                    cached = self._result_cache.get(cache_key)
+                    if cached is not None:
+                        self._result_cache.move_to_end(cache_key)
+                        # Callers may modify the returned dicts, so never hand out the cached ones
+                        return copy.deepcopy(cached)
+        
+        faces = self._detect_with_method(image, method, confidence_threshold, compute_confidence)
+        
+        if cache_key is not None:
+            with self._result_cache_lock:
+                self._result_cache[cache_key] = copy.deepcopy(faces)
+                self._result_cache.move_to_end(cache_key)
+                while len(self._result_cache) > self._result_cache_size:
+                    self._result_cache.popitem(last=False)
+        
+        return faces
+    
+    def _detect_with_method(self, image: str | bytes | np.ndarray, method: str, confidence_threshold: float,
+                            compute_confidence: bool) -> list[dict[str, any]]:
+        """Run the detector for an already validated method"""
         if method == self.DetectionMethodChoices.DNN[0]:
             if self.dnn_net is None:
                 raise Exception("DNN detection method requested but DNN model is not available. Please ensure model files are present.")
-            return self.extract_faces_dnn(image_path, confidence_threshold)
+            return self.extract_faces_dnn(self._load_image(image), confidence_threshold)
+        elif method == self.DetectionMethodChoices.YUNET[0]:
+            if self.yunet_detector is None:
+                raise Exception("YuNet detection method requested but YuNet model is not available. Please ensure the model file is present.")
+            return self.extract_faces_yunet(self._load_image(image), confidence_threshold)
+        elif method == self.DetectionMethodChoices.LBP[0]:
+            if self.lbp_cascade is None:
+                raise Exception("LBP detection method requested but LBP cascade is not available. Please ensure the cascade file is present.")
+            return self.extract_faces_lbp(self._load_image(image), compute_confidence)
         elif method == self.DetectionMethodChoices.HAAR[0]:
-            return self.extract_faces_haar(image_path)
\ No newline at end of file
+            return self.extract_faces_haar(self._load_image(image), compute_confidence)
+
+    def extract_faces_from_bytes(self, data: bytes, method: str, confidence_threshold: float = 0.5) -> list[dict[str, any]]:
+        """
+        Extract faces from an encoded image held in memory (e.g. the contents of an uploaded file),
+        without writing it to disk first.
+        
+        Args:
+            data (bytes): Encoded image bytes (JPEG, PNG, ...)
+            method (str): Detection method - use DetectionMethodChoices values (required)
+            confidence_threshold (float): Minimum confidence threshold (only used for DNN and YuNet methods)
+            
+        Returns:
+            list[dict[str, any]]: List of face detection results
+            
+        Raises:
+            ValueError: If the bytes cannot be decoded or method is not a valid detection method
+        """
+        return self.extract_faces_with_method(self._load_image(data), method, confidence_threshold)
+
+    def extract_faces_many(self, images: list[str], method: str, confidence_threshold: float = 0.5) -> list[list[dict[str, any]]]:
+        """
+        Extract faces from several images, decoding the next image in a background thread
+        while the current one is being detected.
+        Detection itself stays on the calling thread, so the DNN network is never run concurrently.
+        
+        Args:
+            images (list[str]): Paths to the image files
+            method (str): Detection method - use DetectionMethodChoices values (required)
+            confidence_threshold (float): Minimum confidence threshold (only used for DNN and YuNet methods)
+            
+        Returns:
+            list[list[dict[str, any]]]: Face detection results for each image, in input order
+            
+        Raises:
+            ValueError: If method is not a valid detection method or an image cannot be decoded
+            Exception: If DNN, YuNet or LBP method is requested but model is not available
+        """
+        decoded = queue.Queue(maxsize=2)
+        stop = threading.Event()
+        
+        def decode_images():
+            for image in images:
+                if stop.is_set():
+                    return
+                try:
+                    item = self._load_image(image)
+                except Exception as e:
+                    item = e
+                decoded.put(item)
+        
+        decoder = threading.Thread(target=decode_images, name='face-extraction-decoder', daemon=True)
+        decoder.start()
+        
+        results = []
+        try:
+            for image in images:
+                item = decoded.get()
+                if isinstance(item, Exception):
+                    logger.error(f"Error decoding {self._describe(image)}: {str(item)}")
+                    raise item
+                results.append(self.extract_faces_with_method(item, method, confidence_threshold))
+        finally:
+            # Unblock the decoder if detection stopped early
+            stop.set()
+            while decoder.is_alive():
+                try:
+                    decoded.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        
+        return results
+
+    def extract_faces_batch(self, image_paths: list[str], confidence_threshold: float = 0.5,
+                            max_workers: int | None = None, compute_confidence: bool = False,
+                            configure_worker_logging: Callable[[], None] | None = None) -> list[list[dict[str, any]]]:
+        """
+        Run extract_faces over many images in parallel worker processes.
+        Each worker builds its own service once, with this instance's settings, and limits OpenCV
+        to a single thread, so the processes together use one core each instead of competing for all of them.
+        
+        Args:
+            image_paths (list[str]): Paths to the image files
+            confidence_threshold (float): Minimum confidence threshold (only used for DNN detection)
+            max_workers (int | None): Number of worker processes (default: number of CPUs)
+            compute_confidence (bool): Score cascade detections (off by default, batch callers usually
+                only need the bounding boxes)
+            configure_worker_logging (Callable[[], None] | None): Picklable function run first in each
+                worker process to set up its logging; None keeps the logging the worker starts with
+            
+        Returns:
+            list[list[dict[str, any]]]: Face detection results for each image, in input order
+        """
+        workers = max_workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(self._worker_options, configure_worker_logging)) as executor:
+            results = list(executor.map(
+                _extract_faces_in_worker,
+                image_paths,
+                [confidence_threshold] * len(image_paths),
+                [compute_confidence] * len(image_paths),
+                chunksize=max(1, len(image_paths) // (4 * workers))
+            ))
+        
+        logger.info(f"Batch detected {sum(len(faces) for faces in results)} faces in {len(image_paths)} images")
+        return results
+
+    def extract_faces_tiled(self, image: str | np.ndarray, tile: int = 512, overlap: int = 64,
+                            confidence_threshold: float = 0.5, max_workers: int | None = None) -> list[dict[str, any]]:
+        """
+        Extract faces from a very large image by splitting it into overlapping tiles, detecting on
+        the tiles in parallel worker processes and merging detections across tile seams with NMS.
+        Faces larger than a tile cannot be found, so the tile size should be well above the largest
+        expected face.
+        
+        Args:
+            image (str | np.ndarray): Path to the image file or an already decoded BGR image
+            tile (int): Tile width and height in pixels
+            overlap (int): Overlap between neighbouring tiles in pixels
+            confidence_threshold (float): Minimum confidence threshold (only used for DNN detection)
+            max_workers (int | None): Number of worker processes (default: number of CPUs)
+            
+        Returns:
+            list[dict[str, any]]: List of face detection results in full-image coordinates
+            
+        Raises:
+            ValueError: If tile or overlap is not positive, or the overlap is not smaller than the tile
+        """
+        if tile <= 0 or overlap <= 0:
+            raise ValueError(f"Tile size and overlap must be positive (tile: {tile}, overlap: {overlap})")
+        if overlap >= tile:
+            raise ValueError(f"Overlap must be smaller than the tile size (tile: {tile}, overlap: {overlap})")
+        
+        bgr = self._load_image(image)
+        h, w = bgr.shape[:2]
+        
+        def tile_offsets(size: int) -> list[int]:
+            offsets = list(range(0, max(size - tile, 0) + 1, tile - overlap))
+            # Make sure the last tile reaches the image border
+            if offsets[-1] + tile < size:
+                offsets.append(size - tile)
+            return offsets
+        
+        offsets = [(x, y) for y in tile_offsets(h) for x in tile_offsets(w)]
+        tiles = [bgr[y:y + tile, x:x + tile] for x, y in offsets]
+        
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=_init_batch_worker,
+                                 initargs=(self._worker_options,)) as executor:
+            tile_faces = list(executor.map(_extract_faces_in_worker, tiles, [confidence_threshold] * len(tiles)))
+        
+        # Translate tile detections back to full-image coordinates
+        boxes, scores, types = [], [], []
+        for (x_offset, y_offset), faces in zip(offsets, tile_faces):
+            for face in faces:
+                boxes.append([face['bbox_x'] + x_offset, face['bbox_y'] + y_offset, face['bbox_width'], face['bbox_height']])
+                scores.append(face['confidence'])
+                types.append(face['detection_type'])
+        
+        # Faces on tile seams are found by more than one tile
+        detections = Detections(np.array(boxes, np.int32).reshape(-1, 4), np.array(scores, np.float64), types)
+        faces = self._to_face_dicts(self._apply_nms(detections))
+        
+        logger.info(f"Detected {len(faces)} faces in {len(tiles)} tiles of image: {self._describe(image)}")
+        return faces
+
+    def compare_detection_methods(self, image: str | np.ndarray, confidence_threshold: float = 0.5) -> dict[str, list[dict[str, any]]]:
+        """
+        Run every available detection method on the same image.
+        The image is decoded and converted to grayscale once and shared by all methods.
+        
+        Args:
+            image (str | np.ndarray): Path to the image file or an already decoded BGR image
+            confidence_threshold (float): Minimum confidence threshold (only used for DNN and YuNet methods)
+            
+        Returns:
+            dict[str, list[dict[str, any]]]: Face detection results keyed by detection method
+        """
+        bgr, gray = self._decode(image)
+        
+        results = {self.DetectionMethodChoices.HAAR[0]: self._to_face_dicts(self._detect_faces_haar(gray))}
+        if self.lbp_cascade is not None:
+            results[self.DetectionMethodChoices.LBP[0]] = self._to_face_dicts(self._detect_faces_haar(gray, use_lbp=True))
+        if self.dnn_net is not None:
+            results[self.DetectionMethodChoices.DNN[0]] = self._to_face_dicts(self._detect_faces_with_dnn(bgr, confidence_threshold))
+        if self.yunet_detector is not None:
+            results[self.DetectionMethodChoices.YUNET[0]] = self._to_face_dicts(self._detect_faces_yunet(bgr, confidence_threshold))
+        
+        summary = ', '.join(f"{method}: {len(faces)}" for method, faces in results.items())
+        logger.info(f"Detection method comparison for {self._describe(image)} - {summary}")
+        return results
@@ -0,0 +1,240 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+import cv2
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from gallery.models import Picture
+from jobs.models import QueueJob
+from recognition.management.commands.process_dnn_extraction_jobs import Command as DnnCommand
+from recognition.management.commands.process_haar_extraction_jobs import Command as HaarCommand
+from recognition.service import FaceExtractionService
+
+TEST_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testdata', 'ouster.png')
+
+
+class HaarDetectionTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.service = FaceExtractionService()
+        cls.image = cv2.imread(TEST_IMAGE)
+
+    def test_close_up_portrait_is_detected(self):
+        # Scaled up, the face covers most of the shorter side of the image
+        for factor in (2, 4):
+            with self.subTest(factor=factor):
+                image = cv2.resize(self.image, None, fx=factor, fy=factor)
+                faces = self.service.extract_faces_haar(image)
+                self.assertEqual(len(faces), 1)
+                self.assertGreater(faces[0]['bbox_width'], min(image.shape[:2]) // 2)
+
+    def test_frontal_faces_stay_frontal(self):
+        # On this grid the profile cascade also fires on one of the faces, with a larger box
+        grid = np.vstack([np.hstack([self.image] * 3)] * 2)
+        faces = self.service.extract_faces_haar(grid)
+        self.assertEqual([face['detection_type'] for face in faces], ['frontal'] * 6)
+
+    def test_result_cache_keeps_thresholds_apart(self):
+        with mock.patch.object(self.service, '_detect_with_method',
+                               side_effect=lambda image, method, threshold, compute_confidence: [{'threshold': threshold}]) as detect:
+            for threshold in (0.5, 0.505, 0.51, 0.505):
+                faces = self.service.extract_faces_with_method(TEST_IMAGE, 'dnn', threshold)
+                self.assertEqual(faces, [{'threshold': threshold}])
+
+        self.assertEqual(detect.call_count, 3)
+
+
+class DnnModelSharingTests(SimpleTestCase):
+    def test_dnn_model_is_loaded_once_per_process(self):
+        dnn_net = mock.Mock()
+        with mock.patch('recognition.service._dnn_model', None), \
+                mock.patch.object(FaceExtractionService, '_init_dnn_model', return_value=dnn_net) as init_dnn_model:
+            first, second = FaceExtractionService(), FaceExtractionService()
+
+        init_dnn_model.assert_called_once()
+        self.assertIs(first.dnn_net, dnn_net)
+        self.assertIs(second.dnn_net, dnn_net)
+        self.assertIs(first._dnn_lock, second._dnn_lock)
+
+
+class BatchExtractionTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Faces too small for min_face_ratio are only skipped when the workers use it as well
+        cls.service = FaceExtractionService(min_face_ratio=0.4)
+        image = cv2.imread(TEST_IMAGE)
+        cls.images = [image, np.vstack([np.hstack([image] * 3)] * 2), cv2.resize(image, None, fx=3, fy=3)]
+
+    def test_batch_matches_single_image_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            image_paths = []
+            for index, image in enumerate(self.images):
+                image_paths.append(os.path.join(directory, f'{index}.png'))
+                cv2.imwrite(image_paths[-1], image)
+
+            expected = [self.service.extract_faces(path, compute_confidence=False) for path in image_paths]
+            self.assertEqual(self.service.extract_faces_batch(image_paths, max_workers=2), expected)
+
+    def test_tiles_are_detected_with_the_instance_settings(self):
+        # A single tile covering the whole image must find what extract_faces finds
+        image = self.images[1]
+        self.assertEqual(self.service.extract_faces_tiled(image, tile=512, max_workers=1), self.service.extract_faces(image))
+
+    def test_invalid_tiling_is_rejected(self):
+        for tile, overlap in ((64, 64), (64, 128), (0, 0), (512, 0), (-512, 64)):
+            with self.subTest(tile=tile, overlap=overlap):
+                with self.assertRaises(ValueError):
+                    self.service.extract_faces_tiled(self.images[0], tile=tile, overlap=overlap)
+
+
+class ValidateImageTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.service = FaceExtractionService()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as image_file:
+            image_file.write(data)
+        return path
+
+    def test_formats_opencv_decodes_are_valid(self):
+        image = cv2.imread(TEST_IMAGE)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        for extension, source in (('.png', image), ('.jpg', image), ('.ppm', image), ('.pgm', gray)):
+            with self.subTest(extension=extension):
+                _, encoded = cv2.imencode(extension, source)
+                self.assertTrue(self.service.validate_image(self.write(f'image{extension}', encoded.tobytes())))
+
+    def test_unreadable_files_are_invalid(self):
+        with open(TEST_IMAGE, 'rb') as image_file:
+            png = image_file.read()
+        self.assertFalse(self.service.validate_image(self.write('truncated.png', png[:len(png) // 2])))
+        self.assertFalse(self.service.validate_image(self.write('empty.png', b'')))
+        self.assertFalse(self.service.validate_image(os.path.join(self.directory.name, 'missing.png')))
+
+    def test_validation_and_extraction_decode_the_file_once(self):
+        with open(TEST_IMAGE, 'rb') as image_file:
+            path = self.write('image.png', image_file.read())
+
+        with mock.patch('cv2.imdecode', wraps=cv2.imdecode) as imdecode:
+            self.assertTrue(self.service.validate_image(path))
+            imdecode.assert_called_once()
+            self.assertEqual(len(self.service.extract_faces_with_method(path, 'haar')), 1)
+
+        imdecode.assert_called_once()
+
+
+def per_face_confidence(gray, x, y, w, h, edges=None):
+    """Score one face the way the per-face implementation did: std and Canny edge density of its crop"""
+    face_region = gray[y:y+h, x:x+w]
+    size_factor = min(1.0, (w * h) / (100 * 100))
+    contrast = np.std(face_region) / 255.0
+    if edges is None:
+        edge_density = np.sum(cv2.Canny(face_region, 50, 150) > 0) / (w * h)
+    else:
+        edge_density = np.mean(edges[y:y+h, x:x+w])
+    confidence = size_factor * 0.3 + min(contrast, 1.0) * 0.4 + min(edge_density * 10, 1.0) * 0.3
+    return round(max(0.5, min(1.0, confidence)), 3)
+
+
+class HaarConfidenceTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.service = FaceExtractionService()
+        cls.gray = cv2.cvtColor(cv2.imread(TEST_IMAGE), cv2.COLOR_BGR2GRAY)
+        rng = np.random.default_rng(0)
+        sizes = rng.integers(20, 120, 200)
+        cls.boxes = np.array([
+            (rng.integers(0, cls.gray.shape[1] - size + 1), rng.integers(0, cls.gray.shape[0] - size + 1), size, size)
+            for size in sizes
+        ], np.int32)
+
+    def test_scores_match_per_face_canny(self):
+        # One Canny pass over the whole image only differs from per-face Canny at the face borders
+        scores = self.service._calculate_haar_confidences(self.gray, self.service._edge_map(self.gray), self.boxes)
+        expected = np.array([per_face_confidence(self.gray, *box) for box in self.boxes])
+
+        differences = np.abs(scores - expected)
+        self.assertLessEqual(differences.mean(), 0.001)
+        self.assertGreaterEqual(np.mean(differences <= 0.01), 0.98)
+        self.assertLessEqual(differences.max(), 0.05)
+
+    def test_integral_image_scores_match_per_face_statistics(self):
+        # Sums from integral images give the same mean, std and edge density as each face's own pixels
+        edges = self.service._edge_map(self.gray)
+        scores = self.service._calculate_haar_confidences(self.gray, edges, self.boxes)
+        expected = [per_face_confidence(self.gray, *box, edges=edges) for box in self.boxes]
+
+        np.testing.assert_array_equal(scores, expected)
+
+    def test_detection_is_pinned(self):
+        faces = self.service.extract_faces_haar(TEST_IMAGE)
+
+        self.assertEqual(len(faces), 1)
+        self.assertEqual([faces[0][key] for key in ('bbox_x', 'bbox_y', 'bbox_width', 'bbox_height')], [20, 46, 94, 94])
+        # Same score as the original per-face implementation: equalization only feeds the cascades
+        self.assertAlmostEqual(faces[0]['confidence'], 0.631, places=3)
+
+
+class ExtractionJobStatusTests(TestCase):
+    def setUp(self):
+        self.command = HaarCommand(stdout=io.StringIO())
+        self.service = mock.Mock()
+        pictures = [Picture.objects.create(title=f'Picture {i}', image='missing.png') for i in range(3)]
+        self.jobs = [
+            QueueJob.objects.create(picture=picture, job_type=QueueJob.JobTypeChoices.FACE_EXTRACTION_HAAR)
+            for picture in pictures
+        ]
+
+    def statuses(self):
+        return [QueueJob.objects.get(id=job.id).status for job in self.jobs]
+
+    def test_each_job_gets_its_final_status(self):
+        with mock.patch('os.path.exists', side_effect=[True, False, True]), \
+                mock.patch.object(HaarCommand, '_extract_faces_haar'):
+            self.assertEqual(self.command._process_pending_jobs(self.service, 3), (2, 1))
+
+        self.assertEqual(self.statuses(), ['completed', 'failed', 'completed'])
+
+    def test_interrupted_batch_returns_unfinished_jobs_to_pending(self):
+        with mock.patch('os.path.exists', return_value=True), \
+                mock.patch.object(HaarCommand, '_extract_faces_haar', side_effect=[None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                self.command._process_pending_jobs(self.service, 3)
+
+        self.assertEqual(self.statuses(), ['completed', 'pending', 'pending'])
+
+
+class CpuAffinityTests(SimpleTestCase):
+    def setUp(self):
+        self.command = DnnCommand(stdout=io.StringIO())
+
+    @mock.patch('os.nice')
+    @mock.patch('os.sched_setaffinity')
+    @mock.patch('os.sched_getaffinity', return_value={0, 1, 2, 3})
+    def test_invalid_affinity_keeps_current_affinity(self, getaffinity, setaffinity, nice):
+        for cpu_affinity in (',', 'a,b', '1,64', '-1'):
+            with self.subTest(cpu_affinity=cpu_affinity):
+                self.command._configure_cpu_affinity(cpu_affinity)
+        setaffinity.assert_not_called()
+        nice.assert_not_called()
+
+    @mock.patch('os.nice')
+    @mock.patch('os.sched_setaffinity')
+    @mock.patch('os.sched_getaffinity', return_value={0, 1, 2, 3})
+    def test_valid_affinity_is_applied(self, getaffinity, setaffinity, nice):
+        with mock.patch('cv2.setNumThreads'):
+            self.command._configure_cpu_affinity('2, 3')
+        setaffinity.assert_called_once_with(0, {2, 3})
@@ -12,6 +12,7 @@ class TagClassificationAdmin(admin.ModelAdmin):
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'classification')
+    list_select_related = ('classification',)
     list_filter = ('classification',)
     search_fields = ('name',)
     readonly_fields = ('id',)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TaggingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tagging'
+
+    def ready(self):
+        """
+        Connect the signal handlers that keep the cached tags prompt up to date
+        """
+        from tagging import signals  # noqa: F401
@@ -1,5 +1,6 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import base64
 
@@ -8,6 +9,19 @@ class OllamaService:
         self.base_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
         self.timeout = int(os.getenv('OLLAMA_TIMEOUT', '30'))
         self.default_model = os.getenv('OLLAMA_DEFAULT_MODEL')
+        # Requests the server handles at once (the server's own OLLAMA_NUM_PARALLEL setting);
+        # requests sent beyond this wait in Ollama's queue and count against the timeout
+        self.num_parallel = int(os.getenv('OLLAMA_NUM_PARALLEL', '4'))
+        # How long the server keeps a model loaded after a request (e.g. '24h' keeps the
+        # vision model pinned in memory between tagging batches)
+        self.keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '24h')
+        
+        # Reuse keep-alive connections to the Ollama server across requests; the pool is sized
+        # for the concurrent generate requests a tagging batch sends
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         
         # List of vision-capable models
         self.vision_models = [
@@ -22,7 +36,7 @@ class OllamaService:
     def is_server_running(self) -> bool:
         """Check if Ollama server is running"""
         try:
-            response = requests.get(f"{self.base_url}/api/version", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/version", timeout=5)
             return response.status_code == 200
         except requests.RequestException:
             return False
@@ -30,12 +44,24 @@ class OllamaService:
     def list_models(self) -> list[dict]:
         """Get list of available models from Ollama"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=self.timeout)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=self.timeout)
             response.raise_for_status()
             return response.json().get('models', [])
         except requests.RequestException as e:
             raise Exception(f"Failed to list models: {e}")
     
+    def preload(self, model: str) -> None:
+        """Load a model into memory ahead of the first request and keep it loaded for keep_alive"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "keep_alive": self.keep_alive},
+                timeout=max(self.timeout, 300)
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise Exception(f"Failed to preload model {model}: {e}")
+    
     def generate_text(self, prompt: str, model: str = None, **kwargs) -> str:
         """Generate text using Ollama"""
         model = model or self.default_model
@@ -50,7 +76,7 @@ class OllamaService:
         }
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
                 json=payload,
                 timeout=self.timeout
@@ -60,8 +86,9 @@ class OllamaService:
         except requests.RequestException as e:
             raise Exception(f"Failed to generate text: {e}")
     
-    def generate_with_image(self, prompt: str, image_paths: str | list[str], model: str = None) -> str:
-        """Generate text with image input using vision models"""
+    def generate_with_image(self, prompt: str, image_paths: str | bytes | list[str | bytes], model: str = None, format: str | dict = None) -> str:
+        """Generate text with image input using vision models (images are file paths or encoded image bytes).
+        format ('json' or a JSON schema) constrains the response to valid JSON"""
         model = model or self.default_model
         if not model:
             raise ValueError("No model specified and OLLAMA_DEFAULT_MODEL is not set.")
@@ -69,13 +96,16 @@ class OllamaService:
         if model not in self.vision_models:
             raise ValueError(f"Model {model} is not vision-capable. Use one of: {self.vision_models}")
         
-        # Handle single image path or list of image paths
-        if isinstance(image_paths, str):
+        # Handle single image or list of images
+        if isinstance(image_paths, (str, bytes)):
             image_paths = [image_paths]
         
         # Encode all images to base64
         encoded_images = []
         for image_path in image_paths:
+            if isinstance(image_path, bytes):
+                encoded_images.append(base64.b64encode(image_path).decode('utf-8'))
+                continue
             try:
                 with open(image_path, 'rb') as image_file:
                     image_data = base64.b64encode(image_file.read()).decode('utf-8')
@@ -87,11 +117,14 @@ class OllamaService:
             "model": model,
             "prompt": prompt,
             "images": encoded_images,
-            "stream": False
+            "stream": False,
+            "keep_alive": self.keep_alive
         }
+        if format:
+            payload["format"] = format
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
                 json=payload,
                 timeout=self.timeout
@@ -0,0 +1,396 @@
+import io
+import json
+import os
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from jobs.models import QueueJob
+from tagging.models import Tag, TagClassification
+from tagging.signals import CLASSIFICATIONS_CACHE_KEY, get_prompt_version, invalidate_prompt_cache
+
+logger = logging.getLogger(__name__)
+
+# Shared decoder for JSON embedded in the model responses (JSONDecoder is stateless)
+_json_decoder = json.JSONDecoder()
+
+# Words of three or more letters, and the common words the plain text fallback skips
+_WORD_RE = re.compile(r'[^\W\d_]{3,}')
+_STOPWORDS = frozenset({
+    'the', 'and', 'with', 'for', 'are', 'this', 'that', 'there', 'these', 'those', 'from',
+    'into', 'has', 'have', 'its', 'was', 'were', 'image', 'picture', 'photo', 'shows', 'showing',
+    'tag', 'tags', 'classification', 'general',
+})
+
+# Longest side of the images sent to the vision model. Bigger photos only make the upload
+# slower, since the model's image encoder works at a lower resolution anyway
+MAX_IMAGE_SIDE = 1024
+
+
+def load_prompt_template():
+    """Load and prepare the prompt template, reusing the cached copy while the file and classifications are unchanged"""
+    prompt_path = os.path.join(settings.BASE_DIR, 'tagging', 'prompts', 'tags_prompt.txt')
+    try:
+        cache_key = f'tagging:prompt:{os.path.getmtime(prompt_path)}:{get_prompt_version()}'
+        cached_prompt = cache.get(cache_key)
+        if cached_prompt is not None:
+            logger.info('📄 Using cached prompt template')
+            return cached_prompt
+
+        with open(prompt_path, 'r', encoding='utf-8') as f:
+            prompt_template = f.read()
+        logger.info(f'📄 Loaded prompt template from: {prompt_path}')
+    except FileNotFoundError:
+        logger.error(f'❌ Tags prompt file not found at: {prompt_path}')
+        return None
+
+    # Replace template variables
+    prompt_template = _replace_template_variables(prompt_template)
+    cache.set(cache_key, prompt_template, timeout=None)
+    return prompt_template
+
+
+def _replace_template_variables(prompt_template):
+    """Replace template variables in the prompt with actual data"""
+    # Get all tag classifications from the database
+    classification_names = list(TagClassification.objects.values_list('name', flat=True))
+    
+    if classification_names:
+        classifications_text = ", ".join([f'"{name}"' for name in classification_names])
+        logger.info(f'📂 Using {len(classification_names)} tag classifications from database')
+    else:
+        # Default classifications if none exist in database
+        classifications_text = '"Living Things", "Inanimate Objects", "Locations", "Actions", "Environmental", "Descriptive", "Temporal"'
+        logger.info('📂 Using default tag classifications')
+    
+    # Replace the template variable
+    prompt_template = prompt_template.replace('{{classifications}}', classifications_text)
+    
+    return prompt_template
+
+
+def resolve_vision_model(ollama_service, model=None):
+    """Return the vision model to tag with: the given model, else the settings default, else the first available one"""
+    if model:
+        logger.info(f'🤖 Using specified model: {model}')
+        return model
+
+    available_models = ollama_service.get_vision_models()
+    if not available_models:
+        raise Exception('No vision models available')
+
+    # Try to use default model from settings first
+    default_model = getattr(settings, 'OLLAMA_DEFAULT_MODEL', None)
+    if default_model and default_model in available_models:
+        logger.info(f'🤖 Using default vision model from settings: {default_model}')
+        return default_model
+
+    logger.info(f'🤖 Using first available vision model: {available_models[0]}')
+    return available_models[0]
+
+
+def run_batch(ollama_service, prompt_template, model, max_jobs):
+    """Claim and process one batch of pending tagging jobs with the given (already resolved) vision model,
+    returning the (processed, failed) counts"""
+
+    # Claim a batch of pending tagging jobs with a single UPDATE. Rows already locked by another
+    # worker are skipped. SQLite ignores FOR UPDATE, but a concurrent claim then fails with
+    # "database is locked", and the UPDATE only takes jobs that are still pending, so two workers
+    # never claim the same job
+    try:
+        with transaction.atomic():
+            claimed_ids = list(QueueJob.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                job_type=QueueJob.JobTypeChoices.TAGS,
+                status=QueueJob.StatusChoices.PENDING
+            ).order_by('created_at').values_list('id', flat=True)[:max_jobs])
+            claimed_count = QueueJob.objects.filter(id__in=claimed_ids, status=QueueJob.StatusChoices.PENDING).update(
+                status=QueueJob.StatusChoices.PROCESSING, updated_at=timezone.now()
+            ) if claimed_ids else 0
+            if claimed_count != len(claimed_ids):
+                # Some jobs were taken by another worker after they were read; leave the batch to the next run
+                transaction.set_rollback(True)
+                claimed_ids = []
+    except OperationalError as e:
+        # e.g. SQLite's "database is locked" while another worker is claiming; try again next batch
+        logger.warning(f'⚠️ Could not claim tagging jobs, retrying on the next batch: {e}')
+        return 0, 0
+
+    if not claimed_ids:
+        logger.debug('No pending tagging jobs found')
+        return 0, 0
+
+    # Only the fields used below are loaded; statuses are written with update(), not job.save()
+    pending_jobs = list(QueueJob.objects.filter(id__in=claimed_ids).select_related('picture').only(
+        'id', 'picture__id', 'picture__title', 'picture__image'
+    ).order_by('created_at'))
+
+    logger.info(f'📋 Claimed {len(pending_jobs)} pending tagging job(s) to process')
+
+    completed_ids = []
+    failed_ids = []
+
+    try:
+        # Send the batch to Ollama at once so it can serve the requests in parallel, up to the
+        # server's OLLAMA_NUM_PARALLEL slots. Parsing and all ORM work stay on this thread
+        with ThreadPoolExecutor(max_workers=max(1, min(max_jobs, ollama_service.num_parallel))) as executor:
+            futures = {}
+            for job in pending_jobs:
+                job_start_time = time.time()
+                try:
+                    logger.info(f'⚙️ Processing tagging job ID {job.id} for picture ID {job.picture.id}: {job.picture.title}')
+
+                    # Get the image path
+                    image_path = job.picture.image.path
+                    if not os.path.exists(image_path):
+                        raise Exception(f'Image file not found: {image_path}')
+
+                    # Generate tags using Ollama
+                    logger.info(f'🧠 Generating tags using model: {model}')
+
+                    future = executor.submit(_generate_tags, ollama_service, prompt_template, image_path, model)
+                    futures[future] = (job, job_start_time)
+
+                except Exception as e:
+                    failed_ids.append(job.id)
+                    _log_job_failure(job, job_start_time, e)
+
+            # Save the tags of each job as soon as its response arrives
+            for future in as_completed(futures):
+                job, job_start_time = futures[future]
+                try:
+                    tags_data = _parse_tags_response(job, future.result())
+
+                    # Save the tags in one transaction so a failed job leaves no partial tags behind
+                    with transaction.atomic():
+                        process_tags(job.picture, tags_data)
+
+                    completed_ids.append(job.id)
+                    job_duration = time.time() - job_start_time
+                    logger.info(f'✅ Successfully processed tagging job ID {job.id} for picture ID {job.picture.id} in {job_duration:.2f}s')
+
+                except Exception as e:
+                    failed_ids.append(job.id)
+                    _log_job_failure(job, job_start_time, e)
+    finally:
+        # Record the outcome of the batch with one UPDATE per final status. Jobs left unfinished
+        # by an error or a shutdown go back to pending so a later batch picks them up again
+        _update_jobs_status(completed_ids, QueueJob.StatusChoices.COMPLETED)
+        _update_jobs_status(failed_ids, QueueJob.StatusChoices.FAILED)
+        finished_ids = set(completed_ids) | set(failed_ids)
+        _update_jobs_status(
+            [job.id for job in pending_jobs if job.id not in finished_ids], QueueJob.StatusChoices.PENDING
+        )
+
+    return len(completed_ids), len(failed_ids)
+
+
+def _generate_tags(ollama_service, prompt_template, image_path, model):
+    """Send a downscaled copy of the image to the vision model and return its raw response"""
+    return ollama_service.generate_with_image(
+        prompt=prompt_template,
+        image_paths=_prepare_image(image_path),
+        model=model,
+        format='json'
+    )
+
+
+def _prepare_image(image_path):
+    """Return the image as a JPEG no larger than MAX_IMAGE_SIDE, or the original file when PIL can't read it"""
+    try:
+        with Image.open(image_path) as image:
+            # Let the JPEG decoder skip detail that the thumbnail would throw away
+            image.draft('RGB', (MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+            image = ImageOps.exif_transpose(image).convert('RGB')
+    except OSError as e:
+        # Send the file as it is and let the model decide whether it can read it
+        logger.warning(f'⚠️ Could not downscale {image_path}, sending the original file: {e}')
+        return image_path
+
+    image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def _parse_tags_response(job, response):
+    """Parse the tags JSON of the model response, falling back to plain text extraction"""
+    try:
+        # Responses are requested with format='json', so the whole response is normally the JSON object
+        tags_data = json.loads(response)
+    except json.JSONDecodeError:
+        pass
+    else:
+        if isinstance(tags_data, dict):
+            logger.info('✅ Successfully parsed JSON response from AI')
+            return tags_data
+        # Any other JSON value carries no tags of its own; treat it like a response that isn't JSON
+        logger.warning(f'⚠️ JSON response for job ID {job.id} is a {type(tags_data).__name__}, not an object')
+
+    try:
+        # Models that ignore JSON mode may wrap the object in prose: decode it from the first brace
+        json_start = response.find('{')
+        if json_start == -1:
+            raise ValueError('No valid JSON found in response')
+        tags_data, _ = _json_decoder.raw_decode(response, json_start)
+        logger.info('✅ Parsed JSON object embedded in the AI response')
+    except (json.JSONDecodeError, ValueError) as e:
+        logger.warning(f'⚠️ Failed to parse JSON response for job ID {job.id}: {e}')
+        # Try to extract tags from plain text response
+        tags_data = _extract_tags_from_text(response)
+        logger.info('🔄 Using fallback text extraction for tags')
+    return tags_data
+
+
+def _log_job_failure(job, job_start_time, error):
+    """Report a failed tagging job"""
+    job_duration = time.time() - job_start_time
+    logger.error(f'❌ Failed to process tagging job ID {job.id} for picture ID {job.picture.id} after {job_duration:.2f}s: {str(error)}', exc_info=error)
+
+
+def _update_jobs_status(job_ids, status):
+    """Set the status of the given jobs in a single UPDATE"""
+    if job_ids:
+        # update() skips auto_now, so refresh updated_at explicitly
+        QueueJob.objects.filter(id__in=job_ids).update(status=status, updated_at=timezone.now())
+
+
+def process_tags(picture, tags_data):
+    """Process and save tags to the picture with classifications"""
+    if not isinstance(tags_data, dict):
+        logger.warning(f'Invalid tags data format for picture ID {picture.id}')
+        return
+
+    logger.info(f'🏷️ Processing tags for picture ID {picture.id}: {picture.title}')
+
+    # Collect the normalized tag names with their classification names in one pass,
+    # so the classifications and tags can then be resolved together
+    tag_classification_names = _collect_pairs(tags_data)
+    classifications = _resolve_classifications({name for name in tag_classification_names.values() if name})
+    tag_classifications = {
+        tag_name: classifications.get(classification_name)
+        for tag_name, classification_name in tag_classification_names.items()
+    }
+    tag_names = list(tag_classifications)
+
+    existing_tags = {tag.name: tag for tag in Tag.objects.filter(name__in=tag_names)}
+
+    # Create all new tags in a single INSERT (tags created meanwhile by another worker are skipped)
+    Tag.objects.bulk_create([
+        Tag(name=name, classification=classification)
+        for name, classification in tag_classifications.items()
+        if name not in existing_tags
+    ], ignore_conflicts=True)
+
+    # Update classification of existing tags that don't have one
+    tags_to_classify = []
+    for name, tag in existing_tags.items():
+        if not tag.classification_id and tag_classifications[name]:
+            tag.classification = tag_classifications[name]
+            tags_to_classify.append(tag)
+            logger.info(f'🏷️ Updated classification for existing tag: {tag.name}')
+    if tags_to_classify:
+        Tag.objects.bulk_update(tags_to_classify, ['classification'])
+
+    # bulk_create with ignore_conflicts doesn't set primary keys, so fetch the tags again
+    tags = list(Tag.objects.filter(name__in=tag_names))
+
+    # Link the tags with one INSERT on the through table; links the picture already has are
+    # skipped by the database instead of being looked up first as tags.add() does
+    PictureTag = picture.tags.through
+    PictureTag.objects.bulk_create([
+        PictureTag(picture_id=picture.id, tag_id=tag.id) for tag in tags
+    ], ignore_conflicts=True)
+
+    created_tags_count = 0
+    for tag in tags:
+        if tag.name not in existing_tags:
+            created_tags_count += 1
+            classification = tag_classifications[tag.name]
+            logger.info(f'🏷️ Created new tag ID {tag.id}: {tag.name} (Classification: {classification.name if classification else "None"})')
+
+    logger.info(f'✅ Added {len(tags)} tags to picture ID {picture.id}: {picture.title} ({created_tags_count} new tags created)')
+
+
+def _collect_pairs(tags_data):
+    """Map each normalized tag name in the model response to its classification name (or None).
+
+    Accepts the tags_with_classifications array, the legacy nested format and the legacy
+    format without classifications. When a tag repeats, the first classification given wins.
+    """
+    tags_array = tags_data.get('tags_with_classifications')
+    if tags_array is None:
+        # Handle legacy format without classifications
+        pairs = (
+            (tag_name, None)
+            for tags_list in tags_data.values() if isinstance(tags_list, list)
+            for tag_name in tags_list
+        )
+    elif isinstance(tags_array, list):
+        # Process new array format: [{"tag": "dog", "classification": "Living Things"}, ...]
+        pairs = (
+            (tag_obj['tag'], tag_obj['classification'])
+            for tag_obj in tags_array
+            if isinstance(tag_obj, dict) and 'tag' in tag_obj and 'classification' in tag_obj
+        )
+    elif isinstance(tags_array, dict):
+        # Handle legacy nested format
+        pairs = (
+            (tag_name, category_data.get('classification', 'General'))
+            for category_data in tags_array.values() if isinstance(category_data, dict)
+            for tag_name in category_data.get('tags', [])
+        )
+    else:
+        raise ValueError(f'Unsupported tags_with_classifications format: {type(tags_array).__name__}')
+
+    tag_classification_names = {}
+    for tag_name, classification_name in pairs:
+        if tag_name and isinstance(tag_name, str):
+            name = tag_name.lower().strip()
+            if tag_classification_names.get(name) is None:
+                tag_classification_names[name] = classification_name
+    return tag_classification_names
+
+
+def _resolve_classifications(names):
+    """Map classification names to TagClassification objects, creating the missing ones in a single INSERT"""
+    if not names:
+        return {}
+
+    # All classifications are kept in the cache between batches; only a name that isn't there yet
+    # costs a trip to the database
+    classifications = cache.get(CLASSIFICATIONS_CACHE_KEY)
+    if classifications is not None and names <= classifications.keys():
+        return classifications
+
+    classifications = {c.name: c for c in TagClassification.objects.all()}
+    missing_names = names - classifications.keys()
+    if missing_names:
+        TagClassification.objects.bulk_create(
+            [TagClassification(name=name) for name in missing_names],
+            ignore_conflicts=True
+        )
+        # bulk_create doesn't send post_save, so invalidate the cached prompt here
+        invalidate_prompt_cache()
+        for name in sorted(missing_names):
+            logger.info(f'📂 Created new tag classification: {name}')
+
+        # Fetch the new rows to get their primary keys
+        classifications.update({c.name: c for c in TagClassification.objects.filter(name__in=missing_names)})
+
+    # New rows only exist once the surrounding transaction commits, so the map is cached then;
+    # a rolled back job must not leave primary keys of rows that were never saved in the cache
+    transaction.on_commit(lambda: cache.set(CLASSIFICATIONS_CACHE_KEY, classifications, timeout=120))
+    return classifications
+
+
+def _extract_tags_from_text(text):
+    """Fallback method to extract tags from plain text response"""
+    # Keep the distinct words of 3+ letters that are not filler words, in order of appearance
+    words = _WORD_RE.findall(text.lower())
+    potential_tags = list(dict.fromkeys(word for word in words if word not in _STOPWORDS))
+    return {"general": potential_tags[:20]}  # Limit to 20 tags
@@ -0,0 +1,31 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from tagging.models import TagClassification
+
+# The rendered tags prompt lists every tag classification, so its cache entry is keyed on this
+# version, which is bumped whenever the classifications change
+PROMPT_VERSION_CACHE_KEY = 'tagging:prompt_version'
+
+# Name -> TagClassification map shared by the tagging batches
+CLASSIFICATIONS_CACHE_KEY = 'tagging:classifications'
+
+
+def get_prompt_version():
+    """Return the current version of the classifications embedded in the tags prompt"""
+    return cache.get_or_set(PROMPT_VERSION_CACHE_KEY, 0, timeout=None)
+
+
+def invalidate_prompt_cache():
+    """Invalidate the cached tags prompt (bulk operations don't send signals and must call this directly)"""
+    try:
+        cache.incr(PROMPT_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(PROMPT_VERSION_CACHE_KEY, 1, timeout=None)
+
+
+@receiver([post_save, post_delete], sender=TagClassification)
+def tag_classification_changed(sender, **kwargs):
+    invalidate_prompt_cache()
+    cache.delete(CLASSIFICATIONS_CACHE_KEY)
+
@@ -1,3 +1,194 @@
-from django.test import TestCase
+import io
+import os
+import signal
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from gallery.models import Picture
+from jobs.models import QueueJob
+from tagging import runner
+from tagging.management.commands.process_tagging_jobs import Command as ProcessTaggingJobsCommand
+from tagging.models import Tag, TagClassification
+
+
+class RunBatchTests(TestCase):
+    def setUp(self):
+        self.ollama_service = mock.Mock(num_parallel=1)
+        pictures = [Picture.objects.create(title=f'Picture {i}', image=f'picture{i}.jpg') for i in range(3)]
+        self.jobs = [QueueJob.objects.create(picture=picture, job_type=QueueJob.JobTypeChoices.TAGS) for picture in pictures]
+
+    def statuses(self):
+        return [QueueJob.objects.get(id=job.id).status for job in self.jobs]
+
+    def run_batch(self):
+        return runner.run_batch(self.ollama_service, 'prompt', 'gemma3:4b', 3)
+
+    @mock.patch('os.path.exists', return_value=True)
+    @mock.patch('tagging.runner._generate_tags', return_value='{"general": ["dog"]}')
+    def test_jobs_get_their_final_status(self, generate_tags, exists):
+        with mock.patch('tagging.runner.process_tags', side_effect=[None, Exception('boom'), None]):
+            self.assertEqual(self.run_batch(), (2, 1))
+
+        self.assertEqual(sorted(self.statuses()), ['completed', 'completed', 'failed'])
+
+    @mock.patch('os.path.exists', return_value=True)
+    @mock.patch('tagging.runner._generate_tags', return_value='{"general": ["dog"]}')
+    def test_interrupted_batch_returns_unfinished_jobs_to_pending(self, generate_tags, exists):
+        with mock.patch('tagging.runner.process_tags', side_effect=[None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_batch()
+
+        self.assertEqual(sorted(self.statuses()), ['completed', 'pending', 'pending'])
+
+    @mock.patch('os.path.exists', return_value=False)
+    def test_batch_is_claimed_in_one_update(self, exists):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.run_batch(), (0, 3))
+
+        # One UPDATE claims the batch and one records the failures
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(self.statuses(), ['failed', 'failed', 'failed'])
+
+    def test_jobs_taken_meanwhile_leave_the_batch_unclaimed(self):
+        taken_job = self.jobs[1]
+        original_update = QuerySet.update
+
+        def update(queryset, **kwargs):
+            # Another worker claims a job between reading the batch and claiming it
+            original_update(QueueJob.objects.filter(id=taken_job.id), status=QueueJob.StatusChoices.PROCESSING)
+            return original_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update):
+            self.assertEqual(self.run_batch(), (0, 0))
+
+        # The other worker's claim shares this test's connection, so only the untaken jobs are checked
+        statuses = self.statuses()
+        self.assertEqual([statuses[0], statuses[2]], ['pending', 'pending'])
+
+    def test_locked_database_skips_the_batch(self):
+        with mock.patch.object(QueueJob.objects, 'select_for_update', side_effect=OperationalError('database is locked')):
+            self.assertEqual(self.run_batch(), (0, 0))
+
+        self.assertEqual(self.statuses(), ['pending', 'pending', 'pending'])
+
+
+class ParseTagsResponseTests(SimpleTestCase):
+    job = mock.Mock(id=1)
+
+    def test_json_response(self):
+        self.assertEqual(runner._parse_tags_response(self.job, '{"general": ["dog"]}'), {'general': ['dog']})
+
+    def test_json_wrapped_in_prose(self):
+        response = 'Here are the classifications: {"general": ["dog"]} Living Things were found.'
+        self.assertEqual(runner._parse_tags_response(self.job, response), {'general': ['dog']})
+
+    def test_plain_text_fallback(self):
+        self.assertEqual(runner._parse_tags_response(self.job, 'dog, cat'), {'general': ['dog', 'cat']})
+
+    def test_json_that_is_not_an_object_falls_back_to_text(self):
+        self.assertEqual(runner._parse_tags_response(self.job, '["dog", "cat"]'), {'general': ['dog', 'cat']})
+        self.assertEqual(runner._parse_tags_response(self.job, '"dog"'), {'general': ['dog']})
+        self.assertEqual(runner._parse_tags_response(self.job, '42'), {'general': []})
+
+
+class PrepareImageTests(SimpleTestCase):
+    def test_large_image_is_downscaled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            image_path = os.path.join(directory, 'large.png')
+            Image.new('RGB', (3000, 1500), 'red').save(image_path)
+
+            with Image.open(io.BytesIO(runner._prepare_image(image_path))) as image:
+                self.assertEqual(image.size, (runner.MAX_IMAGE_SIDE, runner.MAX_IMAGE_SIDE // 2))
+            self.assertEqual(os.listdir(directory), ['large.png'])
+
+    def test_unreadable_image_is_sent_as_is(self):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            image_file.write(b'not an image')
+            image_file.flush()
+            self.assertEqual(runner._prepare_image(image_file.name), image_file.name)
+
+
+class CollectPairsTests(SimpleTestCase):
+    def test_tags_with_classifications(self):
+        tags_data = {'tags_with_classifications': [
+            {'tag': ' Dog ', 'classification': 'Living Things'},
+            {'tag': 'dog', 'classification': 'Animals'},
+            {'tag': 'beach'},
+        ]}
+        self.assertEqual(runner._collect_pairs(tags_data), {'dog': 'Living Things'})
+
+    def test_legacy_nested_format(self):
+        tags_data = {'tags_with_classifications': {'places': {'classification': 'Locations', 'tags': ['Beach']}}}
+        self.assertEqual(runner._collect_pairs(tags_data), {'beach': 'Locations'})
+
+    def test_legacy_format_without_classifications(self):
+        self.assertEqual(runner._collect_pairs({'general': ['Dog', 'beach']}), {'dog': None, 'beach': None})
+
+    def test_unsupported_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            runner._collect_pairs({'tags_with_classifications': 'dog'})
+
+
+class ProcessTagsTests(TestCase):
+    tags_data = {'tags_with_classifications': [
+        {'tag': 'dog', 'classification': 'Living Things'},
+        {'tag': 'beach', 'classification': 'Locations'},
+    ]}
+
+    def setUp(self):
+        cache.clear()
+        self.pictures = [Picture.objects.create(title=f'Picture {i}', image=f'picture{i}.jpg') for i in range(2)]
+
+    def process_tags(self, picture):
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            runner.process_tags(picture, self.tags_data)
+
+    def test_tags_are_created_and_linked(self):
+        self.process_tags(self.pictures[0])
+        self.process_tags(self.pictures[1])
+
+        for picture in self.pictures:
+            self.assertEqual(
+                sorted(picture.tags.values_list('name', 'classification__name')),
+                [('beach', 'Locations'), ('dog', 'Living Things')]
+            )
+        self.assertEqual(TagClassification.objects.count(), 2)
+
+    def test_rolled_back_job_leaves_no_classifications_in_cache(self):
+        with self.assertRaises(RuntimeError):
+            with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+                runner.process_tags(self.pictures[0], self.tags_data)
+                raise RuntimeError('job failed')
+        self.assertFalse(TagClassification.objects.exists())
+
+        self.process_tags(self.pictures[1])
+
+        for tag in Tag.objects.all():
+            self.assertTrue(TagClassification.objects.filter(id=tag.classification_id).exists())
+        self.assertEqual(self.pictures[1].tags.count(), 2)
+
+
+class ContinuousProcessingTests(SimpleTestCase):
+    def test_each_run_stops_on_its_own_signal_and_restores_the_handlers(self):
+        command = ProcessTaggingJobsCommand(stdout=io.StringIO())
+        previous_handlers = [signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)]
+
+        def run_batch(*args):
+            # A stop signal arrives while the batch is running
+            command._handle_stop_signal(signal.SIGTERM, None)
+            return 0, 0
+
+        with mock.patch('tagging.management.commands.process_tagging_jobs.run_batch', side_effect=run_batch) as batch:
+            command._process_jobs_continuously(mock.Mock(), 'prompt', 'gemma3:4b', 3)
+            command._process_jobs_continuously(mock.Mock(), 'prompt', 'gemma3:4b', 3)
+
+        self.assertEqual(batch.call_count, 2)
+        self.assertEqual([signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)], previous_handlers)